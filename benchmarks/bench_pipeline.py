@@ -0,0 +1,173 @@
+"""
+Benchmark offline cho pipeline giá vàng, chạy trên các trang trong benchmarks/fixtures/.
+
+Các trang này là trang tổng hợp (synthetic) mô phỏng bố cục 24h, btmc và kitco, không phải
+bản lưu từ trang thật (xem benchmarks/fixtures/README.md): dùng để so sánh giữa các commit,
+không phản ánh thời gian thực tế trên trang thật.
+
+Đo riêng từng bước: parse trang (24h, kitco, btmc, Vietcombank), format từng section
+và ghép tin nhắn. Mỗi bước ghi lại thời gian (min/median/mean, ms) và bộ nhớ đỉnh (KB).
+
+    python -m benchmarks.bench_pipeline --output bench.json
+    python -m benchmarks.bench_pipeline --compare bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from unittest import mock
+
+import requests
+
+import main
+from services import fetcher
+from services.formatter import format_btmc_data, format_domestic_data, format_international_data
+from services.vnd_usd_converter import USDVNDConverter
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+
+def _fixture_response(content):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+    response.encoding = "utf-8"
+    return response
+
+
+def _measure(func, iterations):
+    """Chạy func `iterations` lần để đo thời gian, thêm một lần dưới tracemalloc để đo bộ nhớ đỉnh."""
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()  # warm-up
+        for _ in range(iterations):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    stats = {
+        "iterations": iterations,
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+    return stats, result
+
+
+def run_benchmarks(iterations):
+    stages = {}
+
+    domestic_html = _fixture("24h_gia_vang.html")
+    international_html = _fixture("kitco_gold.html")
+    btmc_html = _fixture("btmc_home.html")
+    vietcombank_json = _fixture("vietcombank_exchangerates.json")
+
+    stages["parse_domestic"], (buy_trend, domestic_quotes) = _measure(
+        lambda: fetcher.parse_domestic_page(domestic_html), iterations
+    )
+    stages["parse_international"], (price_in_usd, change, _) = _measure(
+        lambda: fetcher.parse_international_page(international_html), iterations
+    )
+    stages["parse_btmc"], (btmc_quotes, btmc_status, _) = _measure(
+        lambda: fetcher.parse_btmc_page(btmc_html), iterations
+    )
+
+    converter = USDVNDConverter()
+    with mock.patch(
+        "services.vnd_usd_converter.http_client.get",
+        side_effect=lambda *args, **kwargs: _fixture_response(vietcombank_json),
+    ):
+        stages["parse_vietcombank"], exchange_rate = _measure(
+            converter._fetch_from_vietcombank, iterations
+        )
+    price_in_vnd = float(price_in_usd) * exchange_rate / 0.829
+
+    sections = {}
+    stages["format_domestic"], sections["domestic"] = _measure(
+        lambda: format_domestic_data(domestic_quotes, buy_trend), iterations
+    )
+    stages["format_international"], sections["international"] = _measure(
+        lambda: format_international_data(price_in_usd, change, price_in_vnd, exchange_rate), iterations
+    )
+    stages["format_btmc"], sections["btmc"] = _measure(
+        lambda: format_btmc_data(btmc_quotes, btmc_status), iterations
+    )
+
+    data_types = list(main.AVAILABLE_TYPES)
+    stages["compose_message"], _ = _measure(
+        lambda: main._compose_message(data_types, sections, show_header=True), iterations
+    )
+
+    return stages
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _print_comparison(report, baseline):
+    print(f"{'stage':<22} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for name, stats in report["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old:
+            print(f"{name:<22} {'-':>12} {stats['median_ms']:>12.3f} {'-':>7}")
+            continue
+        ratio = stats["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        print(f"{name:<22} {old['median_ms']:>12.3f} {stats['median_ms']:>12.3f} {ratio:>6.2f}x")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the gold price pipeline")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed runs per stage (default: 20)")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report to compare median timings against")
+    args = parser.parse_args()
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "html_parser": fetcher.TARGETED_PARSER,
+        "fixtures": "synthetic",
+        "stages": run_benchmarks(args.iterations),
+    }
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            _print_comparison(report, json.load(f))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main_cli()
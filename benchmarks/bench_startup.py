@@ -0,0 +1,163 @@
+"""
+Benchmark thời gian khởi động (cold start) của main.py.
+
+- Thời gian import từng module (python -X importtime -c "import main").
+- Lần chạy `main.py --check-updates` không có update: thời gian tới lần gọi mạng đầu tiên
+  và tổng thời gian tiến trình. Mạng bị chặn ở socket.getaddrinfo nên không cần kết nối thật.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget-ms 400   # exit 1 nếu vượt budget
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module nặng không được nạp trên đường --check-updates không có update
+HEAVY_MODULES = (
+    "bs4",
+    "lxml",
+    "dotenv",
+    "sqlite3",
+    "http.server",
+    "services.fetcher",
+    "services.formatter",
+    "services.vnd_usd_converter",
+    "services.history_store",
+)
+
+_EMPTY_UPDATE_CHILD = r"""
+import contextlib, io, json, os, runpy, socket, sys, time
+
+os.environ.setdefault("BOT_TOKEN", "bench")
+first_network = []
+
+def _no_network(*args, **kwargs):
+    first_network.append(time.time())
+    raise OSError("network disabled by bench_startup")
+
+socket.getaddrinfo = _no_network
+sys.argv = ["main.py", "--check-updates"]
+with contextlib.redirect_stdout(io.StringIO()):
+    runpy.run_path("main.py", run_name="__main__")
+
+heavy = [m for m in json.loads(os.environ["BENCH_HEAVY"]) if m in sys.modules]
+sys.stderr.write(json.dumps({"first_network": first_network[0] if first_network else None, "heavy": heavy}) + "\n")
+"""
+
+
+def import_times():
+    """Chạy -X importtime trong tiến trình mới, trả về danh sách (module, self_ms, cumulative_ms, depth)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        env=dict(os.environ, BOT_TOKEN=os.environ.get("BOT_TOKEN", "bench")),
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth))
+    return modules
+
+
+def empty_update_run():
+    """Một lần chạy --check-updates (không có update); trả về (ms tới lần gọi mạng đầu, tổng ms, module nặng đã nạp)."""
+    started = time.time()
+    result = subprocess.run(
+        [sys.executable, "-c", _EMPTY_UPDATE_CHILD],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        env=dict(os.environ, BENCH_HEAVY=json.dumps(HEAVY_MODULES), STRUCTURED_LOGS="0"),
+    )
+    total_ms = (time.time() - started) * 1000
+    info = json.loads(result.stderr.strip().splitlines()[-1])
+    first_ms = (info["first_network"] - started) * 1000 if info["first_network"] else None
+    return first_ms, total_ms, info["heavy"]
+
+
+def _stats(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {
+        "min_ms": round(min(values), 1),
+        "median_ms": round(statistics.median(values), 1),
+        "max_ms": round(max(values), 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Startup-time benchmark of main.py")
+    parser.add_argument("--iterations", type=int, default=5, help="Empty --check-updates runs (default: 5)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to report (default: 15)")
+    parser.add_argument(
+        "--budget-ms", type=float,
+        help="Fail (exit 1) if the median empty --check-updates run takes longer than this",
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    modules = import_times()
+    main_ms = next((cumulative for name, _, cumulative, depth in modules if name == "main" and depth == 0), None)
+    slowest = sorted(modules, key=lambda m: m[1], reverse=True)[: args.top]
+
+    runs = [empty_update_run() for _ in range(args.iterations)]
+    heavy = sorted({m for _, _, loaded in runs for m in loaded})
+    total = _stats([r[1] for r in runs])
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "import_main_ms": main_ms,
+        "slowest_imports": [
+            {"module": name, "self_ms": round(self_ms, 2), "cumulative_ms": round(cumulative, 2)}
+            for name, self_ms, cumulative, _ in slowest
+        ],
+        "empty_update": {
+            "iterations": args.iterations,
+            "time_to_first_network": _stats([r[0] for r in runs]),
+            "total": total,
+            "heavy_modules_loaded": heavy,
+        },
+    }
+    if args.budget_ms is not None:
+        report["budget_ms"] = args.budget_ms
+        report["within_budget"] = total["median_ms"] <= args.budget_ms
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if heavy:
+        print(f"Heavy modules loaded on the empty update path: {', '.join(heavy)}", file=sys.stderr)
+    if args.budget_ms is not None and not report["within_budget"]:
+        print(
+            f"Empty update run took {total['median_ms']} ms (median), over the {args.budget_ms} ms budget",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
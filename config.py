@@ -1,27 +1,123 @@
 import os
-from dotenv import load_dotenv
 
 # Load .env
 ENV_PATH = "/secrets/.env"
+LOCAL_ENV_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), ".env")
 
-# Kiểm tra nếu file tồn tại, thì load từ file đó, nếu không thì dùng load_dotenv() mặc định
+# Kiểm tra nếu file tồn tại, thì load từ file đó, nếu không thì dùng .env cạnh config.py.
+# Chỉ import dotenv khi thật sự có file .env (trên Cloud Run biến môi trường đã có sẵn).
 if os.path.exists(ENV_PATH):
+    from dotenv import load_dotenv
+
     load_dotenv(dotenv_path=ENV_PATH)
-else:
-    load_dotenv()
+elif os.path.exists(LOCAL_ENV_PATH):
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=LOCAL_ENV_PATH)
 
 # Lấy các biến môi trường
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHAT_ID = os.getenv("CHAT_ID")
 USER_TAG = os.getenv("USER_TAG", "")
+# Danh sách chat nhận báo cáo định kỳ (cách nhau bởi dấu phẩy); bỏ trống thì chỉ gửi tới CHAT_ID
+BROADCAST_CHAT_IDS = [c.strip() for c in os.getenv("BROADCAST_CHAT_IDS", "").split(",") if c.strip()]
 
 # Các hằng số / đường dẫn cố định
-TELEGRAM_URL = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+TELEGRAM_API_URL = f"https://api.telegram.org/bot{BOT_TOKEN}"
+TELEGRAM_URL = f"{TELEGRAM_API_URL}/sendMessage"
 DOMESTIC_URL = "https://www.24h.com.vn/gia-vang-hom-nay-c425.html"
 INTERNATIONAL_URL = "https://www.kitco.com/charts/gold"
 BTMC_URL = "https://btmc.vn/"
+# Trang lưu trữ giá trong nước theo ngày cho --backfill; {date} là datetime.date (dùng được định dạng strftime)
+DOMESTIC_ARCHIVE_URL = os.getenv("DOMESTIC_ARCHIVE_URL", DOMESTIC_URL + "?ngaythang={date:%Y-%m-%d}")
 TIMEOUT = 15
 
+# Thư mục lưu trạng thái giữa các lần chạy (offset Telegram, cache, ...)
+STATE_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), ".state")
+# Thời gian tối đa chờ tất cả nguồn khi fetch song song (giây)
+FETCH_DEADLINE = TIMEOUT * 3
+
+# Lịch sử giá (SQLite, WAL)
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", os.path.join(STATE_DIR, "history.sqlite3"))
+
+# Section của mỗi nguồn được dùng lại trong khoảng này (giây) cho mọi yêu cầu
+SNAPSHOT_TTL = int(os.getenv("SNAPSHOT_TTL", "60"))
+
+# Định dạng tin nhắn Telegram: markdown (MarkdownV2), narrow (MarkdownV2, cột hẹp cho điện thoại), html hoặc plain
+MESSAGE_FORMAT = os.getenv("MESSAGE_FORMAT", "markdown").lower()
+
+# Lần chạy định kỳ (main): không gửi nếu giá không đổi so với lần gửi trước.
+# PUSH_MODE=full gửi cả bảng khi có thay đổi, PUSH_MODE=changes chỉ gửi các dòng đã đổi
+PUSH_MODE = os.getenv("PUSH_MODE", "full").lower()
+
+# Log dạng JSON (mỗi dòng một sự kiện) cho thời gian xử lý từng bước
+STRUCTURED_LOGS = os.getenv("STRUCTURED_LOGS", "1") != "0"
+# Cổng phục vụ /metrics (Prometheus) cho chế độ --daemon; bỏ trống để tắt
+METRICS_PORT = int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None
+
+# Chế độ --serve: HTTP server phục vụ snapshot giá
+PORT = int(os.getenv("PORT", "8080"))
+SERVER_REFRESH_INTERVAL = int(os.getenv("SERVER_REFRESH_INTERVAL", "60"))  # giây giữa hai lần làm mới
+
+# Lịch làm mới thích ứng (--serve, --schedule): chu kỳ cơ bản theo nguồn, vd. "domestic=120,btmc=300";
+# nguồn không khai báo dùng SERVER_REFRESH_INTERVAL
+REFRESH_INTERVALS = {
+    name.strip(): int(value)
+    for name, _, value in (
+        item.partition("=") for item in os.getenv("REFRESH_INTERVALS", "").split(",") if "=" in item
+    )
+}
+REFRESH_OFF_HOURS_FACTOR = float(os.getenv("REFRESH_OFF_HOURS_FACTOR", "5"))  # ngoài giờ giao dịch: chậm hơn N lần
+REFRESH_BACKOFF_AFTER = int(os.getenv("REFRESH_BACKOFF_AFTER", "3"))  # giãn gấp đôi sau N lần giá không đổi
+REFRESH_MAX_INTERVAL = int(os.getenv("REFRESH_MAX_INTERVAL", "1800"))
+VN_RETAIL_HOURS = (8, 21)  # giờ mở cửa tiệm vàng (giờ Việt Nam, UTC+7)
+
+# Webhook Telegram (chế độ --serve): bật khi có TELEGRAM_WEBHOOK_SECRET
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+TELEGRAM_WEBHOOK_PATH = os.getenv("TELEGRAM_WEBHOOK_PATH", "/telegram/webhook")
+# URL public của server (vd. https://<service>.run.app); có thì tự đăng ký webhook khi khởi động
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL")
+
+# Giới hạn gửi tin của Telegram (tin/giây) cho broadcast
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "25"))  # Telegram cho phép ~30 tin/giây mỗi bot
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))  # 1 tin/giây mỗi chat
+TELEGRAM_GROUP_RATE = float(os.getenv("TELEGRAM_GROUP_RATE", str(20 / 60)))  # 20 tin/phút mỗi nhóm
+BROADCAST_MAX_WORKERS = int(os.getenv("BROADCAST_MAX_WORKERS", "8"))
+BROADCAST_MAX_ATTEMPTS = int(os.getenv("BROADCAST_MAX_ATTEMPTS", "3"))
+
+# Connection pool dùng chung cho mọi request HTTP
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # số host được giữ pool
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))  # số kết nối keep-alive mỗi host
+
+# Tải trang dạng stream và ngừng khi bảng giá đã đóng (24h, BTMC); STREAMING_FETCH=0 để tải cả trang
+STREAMING_FETCH = os.getenv("STREAMING_FETCH", "1") != "0"
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "16384"))
+
+# Thống kê (/stats, --stats) từ history store
+STATS_WINDOW_DAYS = int(os.getenv("STATS_WINDOW_DAYS", "30"))
+STATS_STEP = int(os.getenv("STATS_STEP", "3600"))  # giây giữa hai điểm của chuỗi giá đã lấy mẫu lại
+STATS_MA_SHORT_HOURS = int(os.getenv("STATS_MA_SHORT_HOURS", "24"))
+STATS_MA_LONG_HOURS = int(os.getenv("STATS_MA_LONG_HOURS", "168"))
+
+# Backfill lịch sử (--backfill)
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "4"))
+BACKFILL_RATE_PER_HOST = float(os.getenv("BACKFILL_RATE_PER_HOST", "2"))  # request/giây mỗi host
+BACKFILL_BATCH_DAYS = int(os.getenv("BACKFILL_BATCH_DAYS", "30"))  # số ngày mỗi lô ghi vào history store
+
+# Chế độ daemon cho --check-updates (long-poll getUpdates)
+TELEGRAM_LONG_POLL_TIMEOUT = int(os.getenv("TELEGRAM_LONG_POLL_TIMEOUT", "25"))  # giây
+OFFSET_CHECKPOINT_BATCH = int(os.getenv("OFFSET_CHECKPOINT_BATCH", "20"))  # ghi offset sau N update
+OFFSET_CHECKPOINT_INTERVAL = int(os.getenv("OFFSET_CHECKPOINT_INTERVAL", "30"))  # hoặc sau N giây
+
+# Cache tỷ giá USD/VND dùng chung (lưu trong STATE_DIR)
+EXCHANGE_RATE_TTL = int(os.getenv("EXCHANGE_RATE_TTL", "300"))  # còn "tươi" trong 5 phút
+EXCHANGE_RATE_STALE_TTL = int(os.getenv("EXCHANGE_RATE_STALE_TTL", "21600"))  # vẫn trả về (và làm mới nền) trong 6 giờ
+# Nguồn dự phòng (investing.com) được gọi song song nếu Vietcombank chưa trả lời sau N giây
+EXCHANGE_RATE_HEDGE_DELAY = float(os.getenv("EXCHANGE_RATE_HEDGE_DELAY", "1.5"))
+# Nguồn tỷ giá lỗi liên tiếp N lần thì bị bỏ qua trong M giây
+EXCHANGE_RATE_BREAKER_FAILURES = int(os.getenv("EXCHANGE_RATE_BREAKER_FAILURES", "3"))
+EXCHANGE_RATE_BREAKER_COOLDOWN = int(os.getenv("EXCHANGE_RATE_BREAKER_COOLDOWN", "300"))
+
 # print("Loaded environment variables:")
 # for key, value in os.environ.items():
 #     print(f"{key}: {value}")
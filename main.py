@@ -1,24 +1,70 @@
 from datetime import datetime, timedelta, timezone
 import argparse
+import functools
+import html
 import json
 import os
-
-from services.fetcher import (
-    fetch_btmc_gold_prices,
-    fetch_domestic_gold_prices,
-    fetch_international_gold_prices,
+import signal
+import threading
+import time
+
+from config import (
+    BACKFILL_WORKERS,
+    BROADCAST_CHAT_IDS,
+    MESSAGE_FORMAT,
+    OFFSET_CHECKPOINT_BATCH,
+    OFFSET_CHECKPOINT_INTERVAL,
+    METRICS_PORT,
+    PORT,
+    PUSH_MODE,
+    SERVER_REFRESH_INTERVAL,
+    SNAPSHOT_TTL,
+    STATE_DIR,
+    STATS_WINDOW_DAYS,
+    TELEGRAM_LONG_POLL_TIMEOUT,
+    TELEGRAM_WEBHOOK_PATH,
+    TELEGRAM_WEBHOOK_SECRET,
+    TELEGRAM_WEBHOOK_URL,
 )
-from services.formatter import format_btmc_data, format_domestic_data, format_international_data
-from services.telegram_bot import get_updates, send_to_telegram
+from models.price_quote import SourceSnapshot
+from services import metrics, snapshot_diff, sources
+from services.fetch_engine import run_concurrently
+from services.http_client import print_transport_stats
+from services.render_cache import DEFAULT_VARIANT, PARSE_MODES, VARIANTS, RenderCache, markup_of
+from services.scheduler import AdaptiveScheduler
+from services.snapshot_cache import SnapshotCache
+from services.subscriptions import SubscriptionRegistry, format_alerts, handle_command
+from services.telegram_bot import get_updates, send_to_telegram, set_webhook
 from utils.day_converter import convert_day_to_vietnamese
 
+# Các module chỉ cần cho một số chế độ (history_store, broadcast, http_server,
+# telegram_webhook) được import trong hàm dùng chúng, cũng như parser/formatter/converter
+# trong services.sources: lần chạy --check-updates không có update không phải nạp chúng.
+
+
+# Các nguồn đã đăng ký trong services.sources, theo thứ tự priority
+AVAILABLE_TYPES = sources.names()
+
+# MESSAGE_FORMAT không hợp lệ thì dùng mặc định, thay vì lỗi KeyError mỗi lần render
+if MESSAGE_FORMAT not in VARIANTS:
+    print(
+        f"Unknown MESSAGE_FORMAT {MESSAGE_FORMAT!r} (expected one of {', '.join(VARIANTS)}); "
+        f"using {DEFAULT_VARIANT!r}."
+    )
+    MESSAGE_FORMAT = DEFAULT_VARIANT
+
+# Snapshot đã dựng của từng nguồn, dùng chung giữa các yêu cầu trong source.ttl giây
+_snapshot_cache = SnapshotCache(ttl=SNAPSHOT_TTL)
 
-AVAILABLE_TYPES = ["domestic", "international", "btmc"]
+# Section đã render theo digest snapshot và biến thể (markdown, html, plain, narrow)
+_render_cache = RenderCache()
+
+# Đăng ký cảnh báo giá theo chat (/subscribe), lưu trong .state/subscriptions.json
+_subscriptions = SubscriptionRegistry()
 
 
 def _state_dir():
-    base_dir = os.path.abspath(os.path.dirname(__file__))
-    return os.path.join(base_dir, ".state")
+    return STATE_DIR
 
 
 def _updates_state_path():
@@ -60,47 +106,112 @@ def _extract_requested_types(text):
     return [t for t in AVAILABLE_TYPES if t in lower]
 
 
-def _build_sections(data_types):
-    sections = {}
+def _history_trend(quote):
+    """Xu hướng tính từ lịch sử giá đã lưu, dùng khi trang không hiển thị mũi tên."""
+    from services import history_store
 
-    if "domestic" in data_types:
-        try:
-            buy_trend, data = fetch_domestic_gold_prices()
-            if data:
-                sections["domestic"] = format_domestic_data(data, buy_trend)
-            else:
-                print(buy_trend)
-        except Exception as e:
-            print(f"Domestic fetch failed: {e}")
+    try:
+        return history_store.trend_from_history(quote)
+    except Exception as e:
+        print(f"Failed to read price history: {e}")
+        return None
 
-    if "international" in data_types:
-        try:
-            current_price_in_usd, change, current_price_in_vnd, exchange_rate_to_vnd = (
-                fetch_international_gold_prices()
-            )
-            if change:
-                sections["international"] = format_international_data(
-                    current_price_in_usd, change, current_price_in_vnd, exchange_rate_to_vnd
-                )
-            else:
-                print(current_price_in_usd)
-        except Exception as e:
-            print(f"International fetch failed: {e}")
 
-    if "btmc" in data_types:
+def _build_snapshot(source):
+    """Fetch, parse và render một nguồn; None nếu lỗi."""
+    try:
+        result = source.fetch()
+    except Exception as e:
+        print(f"{source.name} fetch failed: {e}")
+        return None
+    if result is None:
+        return None
+
+    trend = result.trend or (_history_trend(result.quotes[0]) if result.quotes else None)
+    return SourceSnapshot(
+        source=source.name,
+        quotes=result.quotes,
+        trend=trend,
+        text=_render_cache.render(source, result.quotes, trend, result.extra),
+        extra=result.extra,
+    )
+
+
+def _build_and_record(data_type):
+    """Dựng snapshot mới của một nguồn và lưu các dòng giá vào lịch sử."""
+    from services import history_store
+
+    snapshot = _build_snapshot(sources.get(data_type))
+    if snapshot and snapshot.quotes:
         try:
-            data, status, err = fetch_btmc_gold_prices()
-            if not err:
-                sections["btmc"] = format_btmc_data(data, status)
-            else:
-                print(err)
+            history_store.record_quotes(snapshot.quotes)
         except Exception as e:
-            print(f"BTMC fetch failed: {e}")
+            print(f"Failed to record {data_type} price history: {e}")
+    return snapshot
+
+
+def _build_snapshots(data_types):
+    """Fetch song song các nguồn được yêu cầu, trả về dict type -> SourceSnapshot."""
+    selected = [s for s in sources.all_sources() if s.name in data_types]
+    jobs = {
+        s.name: functools.partial(
+            _snapshot_cache.get_or_build, s.name, functools.partial(_build_and_record, s.name), ttl=s.ttl
+        )
+        for s in selected
+    }
+    results = run_concurrently(jobs, deadlines={s.name: s.timeout for s in selected})
+    snapshots = {t: results[t] for t in jobs if results.get(t)}
+    _notify_subscribers(snapshots)
+    return snapshots
+
 
+def _fresh_snapshots(data_types):
+    """Như _build_snapshots nhưng luôn fetch lại (dùng cho lần làm mới theo lịch)."""
+    for t in data_types:
+        _snapshot_cache.invalidate(t)
+    return _build_snapshots(data_types)
+
+
+def _notify_subscribers(snapshots):
+    """Báo cho các chat có ngưỡng đăng ký bị vượt trong snapshot mới."""
+    try:
+        alerts = _subscriptions.evaluate(snapshots)
+    except Exception as e:
+        print(f"Failed to evaluate subscriptions: {e}")
+        return
+    messages = format_alerts(alerts)
+    if messages:
+        # Qua broadcast để cảnh báo gửi cho nhiều chat cũng theo token bucket và retry_after
+        from services.broadcast import send_messages
+
+        delivered = sum(1 for r in send_messages(messages, parse_mode=None).values() if r.ok)
+        print(f"Price alerts: {delivered}/{len(messages)} chats notified.")
+
+
+def _render_sections(snapshots, variant=MESSAGE_FORMAT):
+    return {t: _render_cache.section(sources.get(t), snapshot, variant) for t, snapshot in snapshots.items()}
+
+
+def _build_sections(data_types, variant=MESSAGE_FORMAT):
+    return _render_sections(_build_snapshots(data_types), variant)
+
+
+def _changed_sections(snapshots, deltas, variant=MESSAGE_FORMAT):
+    """Section chỉ gồm các dòng giá đã đổi (PUSH_MODE=changes)."""
+    sections = {}
+    for t, snapshot in snapshots.items():
+        changed = {d.gold_type.split("#", 1)[0] for d in deltas if d.source == t and d.kind != "removed"}
+        if not changed:
+            continue
+        quotes = tuple(q for q in snapshot.quotes if q.gold_type in changed)
+        if len(quotes) == len(snapshot.quotes):
+            sections[t] = _render_cache.section(sources.get(t), snapshot, variant)
+        else:
+            sections[t] = _render_cache.render(sources.get(t), quotes, snapshot.trend, snapshot.extra, variant)
     return sections
 
 
-def _compose_message(data_types, sections, show_header=False):
+def _compose_message(data_types, sections, show_header=False, variant=MESSAGE_FORMAT):
     now = datetime.now(timezone.utc) + timedelta(hours=7)
     current_time = now.strftime("%H:%M:%S")
     current_day = convert_day_to_vietnamese(now.strftime("%A"))
@@ -113,20 +224,25 @@ def _compose_message(data_types, sections, show_header=False):
     ]
     body = "\n\n".join([sections[t] for t in data_types if t in sections])
     message_body = "\n".join(header + [body] if show_header else [body])
-    return "```" + f"{current_time}\n" + f"{current_day} {current_date}\n" + message_body + "```"
-
-
-def _handle_updates():
-    state_path = _updates_state_path()
-    last_update_id = _load_update_offset(state_path)
-    offset = last_update_id + 1 if last_update_id is not None else None
-
-    updates = get_updates(offset=offset, timeout=0)
-    if not updates:
-        print("No updates.")
-        return
-
+    text = f"{current_time}\n" + f"{current_day} {current_date}\n" + message_body
+    markup = markup_of(variant)
+    if markup == "markdown":
+        return "```" + text + "```"
+    if markup == "html":
+        return "<pre>" + html.escape(text, quote=False) + "</pre>"
+    return text
+
+
+def _process_updates(updates, last_update_id):
+    """
+    Trả lời các update, trả về update_id lớn nhất đã xử lý.
+
+    Mỗi nguồn chỉ được fetch một lần cho cả lô update; câu trả lời cho từng
+    chat được ghép từ các section dùng chung.
+    """
     max_update_id = last_update_id or 0
+    replies = []
+    command_replies = []
     for update in updates:
         update_id = update.get("update_id")
         if isinstance(update_id, int) and update_id > max_update_id:
@@ -141,49 +257,356 @@ def _handle_updates():
             continue
 
         text = message.get("text") or message.get("caption") or ""
-        requested = _extract_requested_types(text)
-        if not requested:
-            continue
-
         chat_id = message.get("chat", {}).get("id")
         if chat_id is None:
             continue
 
-        sections = _build_sections(requested)
-        if not sections:
+        if text.startswith("/"):
+            reply = handle_command(_subscriptions, chat_id, text, AVAILABLE_TYPES)
+            if reply is None:
+                reply = _stats_reply(text)
+            if reply is None:
+                reply = _ohlc_reply(text)
+            if reply is not None:
+                command_replies.append((chat_id, reply))
+                continue
+
+        requested = _extract_requested_types(text)
+        if not requested:
             continue
 
+        replies.append((chat_id, requested))
+
+    for chat_id, reply in command_replies:
+        send_to_telegram(reply, chat_id=chat_id, parse_mode=None)
+
+    if not replies:
+        return max_update_id
+
+    all_requested = [t for t in AVAILABLE_TYPES if any(t in requested for _, requested in replies)]
+    sections = _build_sections(all_requested)
+    if not sections:
+        return max_update_id
+
+    for chat_id, requested in replies:
+        if not any(t in sections for t in requested):
+            continue
         payload = _compose_message(requested, sections, show_header=True)
-        send_to_telegram(payload, chat_id=chat_id)
+        send_to_telegram(payload, chat_id=chat_id, parse_mode=_parse_mode())
+
+    return max_update_id
+
+
+def _handle_updates():
+    state_path = _updates_state_path()
+    last_update_id = _load_update_offset(state_path)
+    offset = last_update_id + 1 if last_update_id is not None else None
 
+    updates = get_updates(offset=offset, timeout=0)
+    if not updates:
+        print("No updates.")
+        return
+
+    max_update_id = _process_updates(updates, last_update_id)
     if max_update_id and max_update_id != last_update_id:
         _save_update_offset(state_path, max_update_id)
 
+    print_transport_stats()
+
+
+class _Shutdown(BaseException):
+    pass
+
+
+def _run_updates_daemon():
+    """
+    Chạy liên tục, long-poll getUpdates và trả lời ngay khi có tin nhắn.
+
+    Offset được giữ trong bộ nhớ và chỉ ghi xuống telegram_offset.json theo lô
+    (OFFSET_CHECKPOINT_BATCH update hoặc OFFSET_CHECKPOINT_INTERVAL giây), và một lần
+    cuối khi nhận SIGTERM/SIGINT.
+    """
+    print("Starting Telegram updates daemon...")
+    if METRICS_PORT:
+        metrics.start_metrics_server(METRICS_PORT)
+    state_path = _updates_state_path()
+    last_update_id = _load_update_offset(state_path)
+    saved_update_id = last_update_id
+    pending = 0
+    last_checkpoint = time.monotonic()
+    state = {"stopping": False, "idle": False}
+
+    def _request_stop(signum, frame):
+        print(f"Received signal {signum}; shutting down...")
+        state["stopping"] = True
+        # Đang chờ (long-poll hoặc nghỉ sau lỗi) thì thoát ngay: update chưa nhận sẽ được Telegram gửi lại
+        if state["idle"]:
+            raise _Shutdown()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    try:
+        while not state["stopping"]:
+            offset = last_update_id + 1 if last_update_id is not None else None
+            started = time.monotonic()
+            state["idle"] = True
+            try:
+                updates = get_updates(offset=offset, timeout=TELEGRAM_LONG_POLL_TIMEOUT)
+                # Trả về rỗng quá nhanh nghĩa là lỗi mạng/API: nghỉ một chút thay vì lặp liên tục
+                if not updates and time.monotonic() - started < 1:
+                    time.sleep(5)
+            finally:
+                state["idle"] = False
+
+            if not updates:
+                continue
+
+            max_update_id = _process_updates(updates, last_update_id)
+            if max_update_id:
+                last_update_id = max_update_id
+            pending += len(updates)
+
+            if pending >= OFFSET_CHECKPOINT_BATCH or time.monotonic() - last_checkpoint >= OFFSET_CHECKPOINT_INTERVAL:
+                if last_update_id != saved_update_id and _save_update_offset(state_path, last_update_id):
+                    saved_update_id = last_update_id
+                pending = 0
+                last_checkpoint = time.monotonic()
+    except _Shutdown:
+        pass
+    finally:
+        if last_update_id is not None and last_update_id != saved_update_id:
+            _save_update_offset(state_path, last_update_id)
+        print_transport_stats()
+        print("Telegram updates daemon stopped.")
+
+
+def _run_server():
+    """
+    Phục vụ /prices (JSON), /prices.txt (tin nhắn đã render) và /metrics trên PORT.
+    Snapshot của từng nguồn được làm mới ở nền theo AdaptiveScheduler.
+    Nếu có TELEGRAM_WEBHOOK_SECRET thì nhận thêm update Telegram ở TELEGRAM_WEBHOOK_PATH.
+    """
+    from services.http_server import PriceSnapshotStore, create_server
+    from services.telegram_webhook import WebhookReceiver
+
+    print(f"Starting price server on :{PORT}...")
+    store = PriceSnapshotStore(
+        AVAILABLE_TYPES,
+        lambda types, snapshots: _compose_message(types, _render_sections(snapshots, "plain"), variant="plain"),
+    )
+
+    def _refresh(types):
+        snapshots = _fresh_snapshots(types)
+        store.update(snapshots)
+        print(f"Refreshed snapshots: {', '.join(sorted(snapshots)) or 'none'}")
+        return snapshots
+
+    refresher = AdaptiveScheduler(sources.all_sources(), _refresh)
+
+    webhook = None
+    if TELEGRAM_WEBHOOK_SECRET:
+        webhook = WebhookReceiver(
+            TELEGRAM_WEBHOOK_SECRET,
+            lambda updates: _process_updates(updates, None),
+        )
+        webhook.start()
+        print(f"Accepting Telegram webhook updates on {TELEGRAM_WEBHOOK_PATH}")
+        if TELEGRAM_WEBHOOK_URL:
+            set_webhook(TELEGRAM_WEBHOOK_URL.rstrip("/") + TELEGRAM_WEBHOOK_PATH, TELEGRAM_WEBHOOK_SECRET)
+
+    server = create_server(
+        PORT,
+        store,
+        max_age=SERVER_REFRESH_INTERVAL,
+        webhook=webhook,
+        webhook_path=TELEGRAM_WEBHOOK_PATH,
+    )
+
+    def _request_stop(signum, frame):
+        print(f"Received signal {signum}; shutting down...")
+        refresher.stop()
+        if webhook is not None:
+            webhook.stop()
+        # shutdown() chờ serve_forever dừng nên phải gọi từ luồng khác
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    refresher.start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        print("Price server stopped.")
+
+
+def _run_scheduler():
+    """
+    Tự chạy báo cáo định kỳ thay cho cron: mỗi nguồn được làm mới theo AdaptiveScheduler
+    và chỉ gửi khi giá thay đổi (như main). Dừng khi nhận SIGTERM/SIGINT.
+    """
+    print("Starting scheduled gold price bot...")
+    if METRICS_PORT:
+        metrics.start_metrics_server(METRICS_PORT)
+
+    def _refresh(types):
+        snapshots = _fresh_snapshots(types)
+        if snapshots:
+            _push_snapshots(types, snapshots)
+        return snapshots
+
+    scheduler = AdaptiveScheduler(sources.all_sources(), _refresh)
+
+    def _request_stop(signum, frame):
+        print(f"Received signal {signum}; shutting down...")
+        scheduler.stop()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
 
-def main(data_types):
+    scheduler.start()
+    scheduler.join()
+    print_transport_stats()
+    print("Scheduled gold price bot stopped.")
+
+
+def _parse_mode(variant=MESSAGE_FORMAT):
+    return PARSE_MODES[markup_of(variant)]
+
+
+def _push(message):
+    """Gửi tin nhắn định kỳ; trả về True nếu ít nhất một chat nhận được."""
+    try:
+        if BROADCAST_CHAT_IDS:
+            from services.broadcast import broadcast
+
+            # Tin nhắn chỉ dựng một lần và dùng lại cho mọi chat
+            return any(r.ok for r in broadcast(message, BROADCAST_CHAT_IDS, parse_mode=_parse_mode()).values())
+        return send_to_telegram(message, parse_mode=_parse_mode())
+    except Exception as e:
+        print(f"Failed to send Telegram message: {e}")
+        return False
+
+
+def _push_snapshots(data_types, snapshots, force=False):
+    """Gửi báo cáo nếu giá khác lần gửi trước (hoặc force); PUSH_MODE=changes chỉ gửi các dòng đã đổi."""
+    current = snapshot_diff.normalize(snapshots)
+    previous = snapshot_diff.load_last_snapshot()
+    sections = _render_sections(snapshots)
+
+    if previous is not None and not force:
+        deltas = snapshot_diff.diff_snapshots(previous, current)
+        if not deltas:
+            print("No price changes since last push; skipping Telegram send.")
+            metrics.inc("goldbot_push_total", result="unchanged")
+            return
+        print(f"{len(deltas)} price changes since last push.")
+        for delta in deltas:
+            metrics.log_event("price_delta", **delta.__dict__)
+        if PUSH_MODE == "changes":
+            sections = _changed_sections(snapshots, deltas)
+
+    if sections:
+        sent = _push(_compose_message(data_types, sections))
+        metrics.inc("goldbot_push_total", result="sent" if sent else "failed")
+    else:
+        # Chỉ có dòng bị bỏ khỏi bảng giá: không có gì để gửi nhưng vẫn ghi nhận snapshot mới
+        sent = True
+
+    if sent:
+        # Giữ giá cũ của các nguồn lần này fetch lỗi để lần sau vẫn so sánh được
+        snapshot_diff.save_last_snapshot({**(previous or {}), **current})
+
+
+def main(data_types, force=False):
     print("Starting gold price bot...")
 
-    sections = _build_sections(data_types)
-    if not sections:
+    snapshots = _build_snapshots(data_types)
+    if not snapshots:
         print("No data fetched successfully.")
         print("Gold price bot finished.")
         return
 
-    message = _compose_message(data_types, sections)
-    try:
-        send_to_telegram(message)
-    except Exception as e:
-        print(f"Failed to send Telegram message: {e}")
+    _push_snapshots(data_types, snapshots, force=force)
 
+    print_transport_stats()
     print("Gold price bot finished.")
 
 
+def _stats_reply(text):
+    """Trả lời /stats, hoặc None nếu không phải lệnh /stats. numpy chỉ được import khi cần."""
+    if text.split()[0].split("@", 1)[0].lower() != "/stats":
+        return None
+    try:
+        from services import analytics
+    except ImportError as e:
+        return f"Stats are unavailable: {e}"
+    return analytics.handle_command(text, AVAILABLE_TYPES)
+
+
+def _ohlc_reply(text):
+    """Trả lời /ohlc, hoặc None nếu không phải lệnh /ohlc."""
+    if text.split()[0].split("@", 1)[0].lower() != "/ohlc":
+        return None
+    from services import ohlc
+
+    return ohlc.handle_command(text, AVAILABLE_TYPES)
+
+
+def _run_stats(data_types, days):
+    from services import analytics
+
+    started = time.perf_counter()
+    stats = analytics.compute_stats(data_types, days=days)
+    print(analytics.format_stats(stats, days))
+    print(f"Computed in {(time.perf_counter() - started) * 1000:.1f} ms.")
+
+
+def _positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"invalid value {value!r} (expected a positive integer)")
+    return number
+
+
+def _date_arg(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r} (expected YYYY-MM-DD)")
+
+
+def _run_backfill(start, end, workers):
+    from services.backfill import backfill
+
+    def _request_stop(signum, frame):
+        print(f"Received signal {signum}; shutting down...")
+        # Đi cùng đường với Ctrl+C để backfill ghi nốt các ngày đã tải và checkpoint
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _request_stop)
+
+    try:
+        backfill(start, end, workers=workers)
+    except KeyboardInterrupt:
+        print("Backfill stopped; run the same command again to resume.")
+    print_transport_stats()
+
+
+metrics.describe("goldbot_push_total", "Scheduled pushes by result (sent, unchanged, failed).")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Gold Price Bot")
     parser.add_argument(
         "--type",
         nargs="+",
-        choices=["domestic", "international", "btmc", "all"],
+        choices=AVAILABLE_TYPES + ["all"],
         default=["all"],
         help="Type(s) of gold data to fetch (default: all)",
     )
@@ -192,10 +615,63 @@ if __name__ == "__main__":
         action="store_true",
         help="Check Telegram updates and reply based on requested types",
     )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Serve prices over HTTP on $PORT from snapshots refreshed in the background",
+    )
+    parser.add_argument(
+        "--schedule",
+        action="store_true",
+        help="Keep running and push reports on a built-in schedule adapted to market hours (instead of cron)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="With --check-updates: keep running and long-poll Telegram updates until SIGTERM",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Send the report even if prices have not changed since the last push",
+    )
+
+    parser.add_argument(
+        "--stats",
+        nargs="?",
+        type=_positive_int,
+        const=STATS_WINDOW_DAYS,
+        metavar="DAYS",
+        help=f"Print spread, premium, moving-average and volatility stats of the --type sources"
+             f" from the history store (default: last {STATS_WINDOW_DAYS} days)",
+    )
+    parser.add_argument(
+        "--backfill",
+        nargs=2,
+        metavar=("START", "END"),
+        type=_date_arg,
+        help="Load domestic prices for the days START..END (YYYY-MM-DD) from the archive pages into the history store",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=BACKFILL_WORKERS,
+        help=f"With --backfill: number of pages fetched in parallel (default: {BACKFILL_WORKERS})",
+    )
 
     args = parser.parse_args()
 
-    if args.check_updates:
+    if args.stats is not None:
+        _run_stats(list(AVAILABLE_TYPES) if "all" in args.type else args.type, args.stats)
+    elif args.backfill:
+        _run_backfill(*args.backfill, args.workers)
+    elif args.serve:
+        _run_server()
+    elif args.schedule:
+        _run_scheduler()
+    elif args.check_updates and args.daemon:
+        _run_updates_daemon()
+    elif args.check_updates:
         _handle_updates()
     else:
         if "all" in args.type:
@@ -203,4 +679,4 @@ if __name__ == "__main__":
         else:
             types = args.type
 
-        main(types)
+        main(types, force=args.force)
@@ -0,0 +1,127 @@
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+# Các trang trong nước niêm yết giá theo đơn vị nghìn đồng
+PRICE_UNIT = 1000
+
+_NON_DIGITS = re.compile(r"[^\d]")
+_SIGNED_NUMBER = re.compile(r"[+-]?\d[\d,]*(?:\.\d+)?")
+
+
+@dataclass(frozen=True, slots=True)
+class PriceQuote:
+    """
+    Một dòng giá của một nguồn.
+
+    Giá và thay đổi giá đều là số nguyên VND. buy/sell là None khi trang ghi
+    "Liên hệ"; buy_change/sell_change là None khi trang không hiển thị thay đổi.
+    """
+
+    source: str
+    gold_type: str
+    buy: Optional[int]
+    sell: Optional[int]
+    buy_change: Optional[int] = None
+    sell_change: Optional[int] = None
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        return {
+            "source": self.source,
+            "gold_type": self.gold_type,
+            "buy": self.buy,
+            "sell": self.sell,
+            "buy_change": self.buy_change,
+            "sell_change": self.sell_change,
+            "timestamp": self.timestamp,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PriceQuote":
+        return cls(
+            source=data["source"],
+            gold_type=data["gold_type"],
+            buy=data.get("buy"),
+            sell=data.get("sell"),
+            buy_change=data.get("buy_change"),
+            sell_change=data.get("sell_change"),
+            timestamp=data.get("timestamp") or time.time(),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class SourceSnapshot:
+    """Kết quả một lần lấy dữ liệu của một nguồn: các dòng giá, xu hướng và section đã render."""
+
+    source: str
+    quotes: Tuple[PriceQuote, ...]
+    trend: Optional[str]
+    text: str
+    fetched_at: float = field(default_factory=time.time)
+    extra: tuple = ()  # dữ liệu riêng của nguồn để render lại section (vd. giá USD, tỷ giá)
+
+
+@dataclass(frozen=True, slots=True)
+class OHLCBar:
+    """
+    Giá mở/cao/thấp/đóng của một loại vàng trong một khoảng (giờ hoặc ngày) bắt đầu tại `start`.
+    side là 'buy' hoặc 'sell'; samples là số lần ghi giá vào khoảng đó.
+    """
+
+    source: str
+    gold_type: str
+    side: str
+    resolution: str
+    start: float
+    open: int
+    high: int
+    low: int
+    close: int
+    samples: int
+
+    def to_dict(self) -> dict:
+        return {
+            "source": self.source,
+            "gold_type": self.gold_type,
+            "side": self.side,
+            "resolution": self.resolution,
+            "start": self.start,
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "samples": self.samples,
+        }
+
+
+def parse_amount(text, unit=PRICE_UNIT) -> Optional[int]:
+    """'148,500' -> 148500000 (VND). Trả về None nếu không có chữ số (vd. 'Liên hệ')."""
+    digits = _NON_DIGITS.sub("", text or "")
+    if not digits:
+        return None
+    return int(digits) * unit
+
+
+def parse_signed_number(text) -> Optional[float]:
+    """Số có dấu đầu tiên trong chuỗi: '+12.30 (+0.53%)' -> 12.3."""
+    match = _SIGNED_NUMBER.search(text or "")
+    if not match:
+        return None
+    return float(match.group().replace(",", ""))
+
+
+def format_amount(value, unit=PRICE_UNIT) -> str:
+    """148500000 -> '148,500'; None -> 'LH' (liên hệ)."""
+    if value is None:
+        return "LH"
+    return f"{value // unit:,}"
+
+
+def format_change(value, unit=PRICE_UNIT) -> str:
+    """500000 -> '▲500', -300000 -> '▼300', 0/None -> ''."""
+    if not value:
+        return ""
+    symbol = "▲" if value > 0 else "▼"
+    return f"{symbol}{abs(value) // unit:,}"
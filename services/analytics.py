@@ -0,0 +1,246 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from config import STATS_MA_LONG_HOURS, STATS_MA_SHORT_HOURS, STATS_STEP, STATS_WINDOW_DAYS
+from models.price_quote import PRICE_UNIT
+from services import history_store, sources as source_registry
+
+# Giá thế giới (VND/lượng, xem fetcher.make_international_quote) dùng để tính premium
+WORLD_SOURCE = "international"
+WORLD_TYPE = "XAU"
+
+USAGE = (
+    "Usage: /stats [source|all] [days]\n"
+    "  e.g. /stats, /stats domestic 7, /stats btmc 90"
+)
+
+
+@dataclass(frozen=True)
+class PriceSeries:
+    """
+    Chuỗi giá của một loại vàng: các mảng timestamp, buy, sell (NaN khi không có giá).
+    samples là số dòng gốc trong history store (có thể nhiều hơn số điểm khi nạp theo bucket).
+    """
+
+    gold_type: str
+    timestamps: np.ndarray
+    buy: np.ndarray
+    sell: np.ndarray
+    samples: int
+
+
+@dataclass(frozen=True)
+class GoldTypeStats:
+    """
+    Thống kê của một loại vàng trong cửa sổ thời gian (NaN nếu không tính được).
+
+    Giá, spread và MA tính theo đơn vị niêm yết của nguồn (`unit`, vd. chỉ với BTMC);
+    premium = giá mua quy ra VND/lượng - giá thế giới quy đổi (VND/lượng).
+    MA và độ biến động tính trên giá mua đã lấy mẫu lại theo STATS_STEP.
+    """
+
+    source: str
+    gold_type: str
+    samples: int
+    buy: float
+    sell: float
+    spread: float
+    spread_pct: float
+    mean_spread: float
+    ma_short: float
+    ma_long: float
+    volatility_pct: float  # độ lệch chuẩn lợi suất log theo ngày, %
+    unit: str = "tael"
+    premium: Optional[float] = None
+    premium_pct: Optional[float] = None
+    mean_premium_pct: Optional[float] = None
+
+
+def load_series(source, start, end=None, bucket=None, path=None):
+    """
+    Nạp lịch sử của một nguồn thành dict gold_type -> PriceSeries.
+    Với `bucket` (giây) chỉ nạp giá cuối cùng của mỗi khoảng, đủ cho resample theo cùng bước.
+    """
+    rows = history_store.query_columns(source, start, end, bucket=bucket, path=path)
+    if not rows:
+        return {}
+
+    table = np.array(rows, dtype=object)
+    gold_types = table[:, 0]
+    values = table[:, 1:].astype(float)  # None -> NaN
+
+    # Các dòng đã sắp theo gold_type: cắt tại chỗ gold_type đổi
+    bounds = np.flatnonzero(gold_types[1:] != gold_types[:-1]) + 1
+    series = {}
+    for begin, chunk in zip(np.concatenate(([0], bounds)), np.split(values, bounds)):
+        gold_type = gold_types[begin]
+        series[gold_type] = PriceSeries(gold_type, chunk[:, 0], chunk[:, 1], chunk[:, 2], int(chunk[:, 3].sum()))
+    return series
+
+
+def resample(timestamps, values, grid):
+    """Giá tại từng mốc của `grid` (giá gần nhất trước đó, NaN nếu chưa có)."""
+    idx = np.searchsorted(timestamps, grid, side="right") - 1
+    return np.where(idx >= 0, values[np.maximum(idx, 0)], np.nan)
+
+
+def moving_average(values, window):
+    """Trung bình trượt `window` điểm (bỏ qua NaN); các điểm đầu dùng cửa sổ ngắn hơn."""
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    hi = np.arange(1, len(values) + 1)
+    lo = np.maximum(hi - window, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (sums[hi] - sums[lo]) / (counts[hi] - counts[lo])
+
+
+def volatility(values, steps_per_day):
+    """Độ lệch chuẩn lợi suất log giữa các điểm liên tiếp, quy ra theo ngày (%)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.diff(np.log(values))
+    returns = returns[np.isfinite(returns)]
+    if len(returns) < 2:
+        return np.nan
+    return float(np.std(returns, ddof=1) * np.sqrt(steps_per_day) * 100)
+
+
+def _last(values):
+    finite = values[np.isfinite(values)]
+    return float(finite[-1]) if len(finite) else np.nan
+
+
+def _mean(values):
+    finite = values[np.isfinite(values)]
+    return float(finite.mean()) if len(finite) else np.nan
+
+
+def series_stats(source, series, grid, world=None, step=STATS_STEP, unit="tael"):
+    """
+    Thống kê của một PriceSeries trên lưới thời gian `grid`; `world` là giá thế giới (VND/lượng)
+    đã lấy mẫu trên cùng lưới. `unit` là đơn vị niêm yết của nguồn, dùng để quy giá ra lượng.
+    """
+    buy = resample(series.timestamps, series.buy, grid)
+    sell = resample(series.timestamps, series.sell, grid)
+    spread = sell - buy
+
+    last_buy, last_sell = _last(series.buy), _last(series.sell)
+    last_spread = last_sell - last_buy
+    ma_short = moving_average(buy, max(1, round(STATS_MA_SHORT_HOURS * 3600 / step)))
+    ma_long = moving_average(buy, max(1, round(STATS_MA_LONG_HOURS * 3600 / step)))
+
+    premium = premium_pct = mean_premium_pct = None
+    if world is not None:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            gap = buy * source_registry.UNITS_PER_TAEL[unit] - world
+            gap_pct = gap / world * 100
+        premium, premium_pct, mean_premium_pct = _last(gap), _last(gap_pct), _mean(gap_pct)
+
+    return GoldTypeStats(
+        source=source,
+        gold_type=series.gold_type,
+        samples=series.samples,
+        buy=last_buy,
+        sell=last_sell,
+        spread=last_spread,
+        spread_pct=last_spread / last_sell * 100 if last_sell else np.nan,
+        mean_spread=_mean(spread),
+        ma_short=_last(ma_short),
+        ma_long=_last(ma_long),
+        volatility_pct=volatility(buy, 86400 / step),
+        unit=unit,
+        premium=premium,
+        premium_pct=premium_pct,
+        mean_premium_pct=mean_premium_pct,
+    )
+
+
+def compute_stats(sources, days=STATS_WINDOW_DAYS, step=STATS_STEP, now=None, path=None):
+    """
+    Thống kê spread, premium so với giá thế giới, MA và độ biến động của mọi loại vàng
+    thuộc `sources` trong `days` ngày gần nhất, từ history store.
+    """
+    end = now if now is not None else time.time()
+    start = end - days * 86400
+    # Mốc lưới là cuối các khoảng `step` giây, khớp với bucket mà history store gộp
+    grid = np.append(np.arange(np.ceil(start / step) * step, end, step)[1:], end)
+
+    world = None
+    world_series = load_series(WORLD_SOURCE, start, end, bucket=step, path=path).get(WORLD_TYPE)
+    if world_series is not None:
+        world = resample(world_series.timestamps, world_series.buy, grid)
+
+    stats = []
+    for source in sources:
+        unit = source_registry.get(source).price_unit
+        for series in load_series(source, start, end, bucket=step, path=path).values():
+            stats.append(series_stats(source, series, grid, None if source == WORLD_SOURCE else world, step, unit))
+    return stats
+
+
+def _amount(value):
+    if value is None or not np.isfinite(value):
+        return "n/a"
+    return f"{round(value / PRICE_UNIT):,}"
+
+
+def _signed_amount(value):
+    if value is None or not np.isfinite(value):
+        return "n/a"
+    return f"{round(value / PRICE_UNIT):+,}"
+
+
+def _pct(value, signed=False):
+    if value is None or not np.isfinite(value):
+        return "n/a"
+    return f"{value:+.2f}%" if signed else f"{value:.2f}%"
+
+
+def format_stats(stats, days=STATS_WINDOW_DAYS):
+    """Báo cáo dạng text thường (giá nghìn VND theo đơn vị của từng nguồn) cho /stats và --stats."""
+    if not stats:
+        return f"No price history in the last {days} days."
+
+    lines = [f"Stats for the last {days} days (thousand VND)"]
+    source = None
+    for s in stats:
+        if s.source != source:
+            source = s.source
+            lines.append(f"\n[{source}] per {s.unit}")
+        lines.append(
+            f"{s.gold_type} ({s.samples:,} samples): buy {_amount(s.buy)}, sell {_amount(s.sell)}, "
+            f"spread {_amount(s.spread)} ({_pct(s.spread_pct)}), avg {_amount(s.mean_spread)}"
+        )
+        detail = (
+            f"  MA{STATS_MA_SHORT_HOURS}h {_amount(s.ma_short)}, MA{STATS_MA_LONG_HOURS}h {_amount(s.ma_long)}, "
+            f"vol {_pct(s.volatility_pct)}{'/day' if np.isfinite(s.volatility_pct) else ''}"
+        )
+        if s.premium is not None:
+            detail += (
+                f", premium {_signed_amount(s.premium)}/tael ({_pct(s.premium_pct, signed=True)}),"
+                f" avg {_pct(s.mean_premium_pct, signed=True)}"
+            )
+        lines.append(detail)
+    return "\n".join(lines)
+
+
+def handle_command(text, available_types, path=None):
+    """Xử lý /stats [source|all] [days]; trả về câu trả lời, hoặc None nếu không phải lệnh /stats."""
+    parts = text.strip().split()
+    if not parts or parts[0].split("@", 1)[0].lower() != "/stats":
+        return None
+
+    sources = list(available_types)
+    days = STATS_WINDOW_DAYS
+    for arg in parts[1:]:
+        arg = arg.lower()
+        if arg.isdigit() and int(arg) > 0:
+            days = int(arg)
+        elif arg in available_types:
+            sources = [arg]
+        elif arg != "all":
+            return f"Sources: {', '.join(available_types)}\n\n" + USAGE
+    return format_stats(compute_stats(sources, days=days, path=path), days)
@@ -0,0 +1,224 @@
+import dataclasses
+import datetime
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+from config import (
+    BACKFILL_BATCH_DAYS,
+    BACKFILL_RATE_PER_HOST,
+    BACKFILL_WORKERS,
+    DOMESTIC_ARCHIVE_URL,
+    STATE_DIR,
+    STREAMING_FETCH,
+)
+from services import history_store, http_client, metrics
+from services.fetcher import DOMESTIC_TARGET, parse_domestic_page
+from services.scheduler import VN_TZ
+from utils.html_stream import ElementStreamWatcher
+from utils.rate_limit import TokenBucket
+
+BACKFILL_CHECKPOINT_PATH = os.path.join(STATE_DIR, "backfill_checkpoint.json")
+
+# Trang lưu trữ chỉ có một bảng giá mỗi ngày: gán cho các dòng giá của ngày đó
+# thời điểm cuối ngày (giờ Việt Nam), cố định để chạy lại không tạo dòng trùng.
+DAY_CLOSE = datetime.time(23, 59)
+
+
+def date_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def day_timestamp(day):
+    return datetime.datetime.combine(day, DAY_CLOSE, tzinfo=VN_TZ).timestamp()
+
+
+class ArchiveDateMismatch(Exception):
+    """Trang lưu trữ không hiển thị ngày được yêu cầu (vd. trang bỏ qua ?ngaythang và trả về giá hôm nay)."""
+
+
+def shows_date(content, day):
+    """Trang có chứa ngày `day` ở một trong các dạng thường gặp (01/02/2024, 1/2/2024, 01-02-2024, 2024-02-01) không."""
+    formats = {
+        f"{day:%d/%m/%Y}",
+        f"{day.day}/{day.month}/{day.year}",
+        f"{day:%d-%m-%Y}",
+        day.isoformat(),
+    }
+    return any(text.encode("utf-8") in content for text in formats)
+
+
+class Checkpoint:
+    """
+    Các ngày đã backfill xong (đã ghi vào history store), lưu trong STATE_DIR theo
+    từng mẫu URL, để lần chạy bị ngắt có thể chạy tiếp mà không tải lại.
+    """
+
+    def __init__(self, url_template, path=BACKFILL_CHECKPOINT_PATH):
+        self.url_template = url_template
+        self.path = path
+        self._data = self._load()
+        self.done = set(self._data.get(url_template, []))
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Failed to load backfill checkpoint: {e}")
+            return {}
+
+    def mark(self, days):
+        self.done.update(day.isoformat() for day in days)
+        self._data[self.url_template] = sorted(self.done)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Failed to save backfill checkpoint: {e}")
+
+    def __contains__(self, day):
+        return day.isoformat() in self.done
+
+
+class _HostLimiter:
+    """Một TokenBucket cho mỗi host: tối đa `rate` request/giây tới cùng một trang."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, capacity=1)
+        bucket.acquire()
+
+
+def _download(url):
+    if STREAMING_FETCH:
+        watcher = ElementStreamWatcher(*DOMESTIC_TARGET)
+        response, content, _ = http_client.get_until(url, watcher.feed)
+    else:
+        response = http_client.get(url)
+        content = response.content
+    response.raise_for_status()
+    return content
+
+
+def fetch_day(day, url_template, limiter):
+    """Tải và parse trang lưu trữ của một ngày; trả về danh sách PriceQuote (rỗng nếu trang không có bảng giá)."""
+    url = url_template.format(date=day)
+    limiter.acquire(url)
+    with metrics.timed("fetch", "backfill", day=day.isoformat()):
+        content = _download(url)
+    if not shows_date(content, day):
+        raise ArchiveDateMismatch(f"archive page for {day} does not show that date")
+    with metrics.timed("parse", "backfill"):
+        _, data = parse_domestic_page(content)
+    timestamp = day_timestamp(day)
+    return [dataclasses.replace(q, timestamp=timestamp) for q in data]
+
+
+def backfill(start, end, workers=BACKFILL_WORKERS, url_template=DOMESTIC_ARCHIVE_URL,
+             rate=BACKFILL_RATE_PER_HOST, batch_days=BACKFILL_BATCH_DAYS, checkpoint=None):
+    """
+    Tải giá trong nước của các ngày [start, end] từ trang lưu trữ và ghi vào history store.
+
+    Các ngày được tải song song (tối đa `workers` luồng, `rate` request/giây mỗi host).
+    Dòng giá được ghi theo lô `batch_days` ngày, và khi vòng lặp thoát vì lỗi hoặc
+    KeyboardInterrupt (Ctrl+C; --backfill chuyển SIGTERM thành KeyboardInterrupt) thì các ngày
+    đã tải được ghi nốt. Checkpoint chỉ ghi nhận một ngày sau khi dòng giá của nó đã được ghi,
+    nên lần chạy bị ngắt chạy lại sẽ bỏ qua các ngày đã xong.
+    Ngày lỗi, không có bảng giá hoặc trang không hiển thị đúng ngày không được ghi nhận
+    và sẽ được thử lại lần sau. `end` được giới hạn tới hôm qua (giờ Việt Nam): giá hôm nay
+    vẫn đang đổi và được ghi bởi lần fetch thường, không gán thời điểm cuối ngày trong tương lai.
+    Trả về dict thống kê: done, skipped, empty, mismatched, failed, rows.
+    """
+    yesterday = datetime.datetime.now(VN_TZ).date() - datetime.timedelta(days=1)
+    if end > yesterday:
+        print(f"Backfill stops at {yesterday}: today's prices are recorded by the regular fetch.")
+        end = yesterday
+    checkpoint = checkpoint or Checkpoint(url_template)
+    days = [day for day in date_range(start, end) if day not in checkpoint]
+    stats = {
+        "done": 0,
+        "skipped": max((end - start).days + 1, 0) - len(days),
+        "empty": 0,
+        "mismatched": 0,
+        "failed": 0,
+        "rows": 0,
+    }
+    print(f"Backfilling {len(days)} days ({stats['skipped']} already done) with {workers} workers...")
+    if not days:
+        return stats
+
+    limiter = _HostLimiter(rate)
+    pending_days, pending_quotes = [], []
+
+    def _flush():
+        if not pending_days:
+            return
+        stats["rows"] += history_store.replace_quotes(pending_quotes)
+        checkpoint.mark(pending_days)
+        stats["done"] += len(pending_days)
+        print(f"Backfill: {stats['done']}/{len(days)} days stored ({stats['rows']} rows).")
+        pending_days.clear()
+        pending_quotes.clear()
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(fetch_day, day, url_template, limiter): day for day in days}
+        for future in as_completed(futures):
+            day = futures[future]
+            try:
+                quotes = future.result()
+            except ArchiveDateMismatch as e:
+                print(f"Skipping {day}: {e}.")
+                stats["mismatched"] += 1
+                metrics.inc("goldbot_backfill_days_total", result="mismatched")
+                continue
+            except Exception as e:
+                print(f"Backfill of {day} failed: {e}")
+                stats["failed"] += 1
+                metrics.inc("goldbot_backfill_days_total", result="failed")
+                continue
+            if not quotes:
+                print(f"No price table for {day}.")
+                stats["empty"] += 1
+                metrics.inc("goldbot_backfill_days_total", result="empty")
+                continue
+            metrics.inc("goldbot_backfill_days_total", result="done")
+            pending_days.append(day)
+            pending_quotes.extend(quotes)
+            if len(pending_days) >= batch_days:
+                _flush()
+    except KeyboardInterrupt:
+        print("Backfill interrupted; saving progress...")
+        raise
+    finally:
+        _flush()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    print(
+        f"Backfill finished: {stats['done']} days stored, {stats['skipped']} skipped, "
+        f"{stats['empty']} empty, {stats['mismatched']} wrong date, {stats['failed']} failed, {stats['rows']} rows."
+    )
+    return stats
+
+
+metrics.describe("goldbot_backfill_days_total", "Backfilled archive days by result (done, empty, mismatched, failed).")
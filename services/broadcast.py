@@ -0,0 +1,146 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+
+from config import (
+    BROADCAST_MAX_ATTEMPTS,
+    BROADCAST_MAX_WORKERS,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_GROUP_RATE,
+)
+from services import metrics
+from services.telegram_bot import post_message
+from utils.rate_limit import TokenBucket
+
+
+@dataclass
+class DeliveryResult:
+    chat_id: str
+    ok: bool
+    status: Optional[int] = None
+    attempts: int = 0
+    error: Optional[str] = None
+
+
+class _ChatBuckets:
+    """Một token bucket cho mỗi chat: chat riêng TELEGRAM_CHAT_RATE/giây, nhóm (id âm) TELEGRAM_GROUP_RATE/giây."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get(self, chat_id):
+        with self._lock:
+            bucket = self._buckets.get(chat_id)
+            if bucket is None:
+                is_group = str(chat_id).startswith("-")
+                rate = TELEGRAM_GROUP_RATE if is_group else TELEGRAM_CHAT_RATE
+                bucket = self._buckets[chat_id] = TokenBucket(rate, capacity=1)
+            return bucket
+
+
+_global_bucket = TokenBucket(TELEGRAM_GLOBAL_RATE)
+_chat_buckets = _ChatBuckets()
+
+
+def _retry_after(response):
+    try:
+        return int(response.json().get("parameters", {}).get("retry_after") or 1)
+    except (ValueError, AttributeError):
+        return 1
+
+
+def _deliver(chat_id, message, parse_mode, max_attempts):
+    result = DeliveryResult(chat_id=str(chat_id), ok=False)
+    chat_bucket = _chat_buckets.get(chat_id)
+
+    while result.attempts < max_attempts:
+        chat_bucket.acquire()
+        _global_bucket.acquire()
+        result.attempts += 1
+        try:
+            response = post_message(chat_id, message, parse_mode=parse_mode)
+        except requests.RequestException as e:
+            result.error = str(e)
+            if result.attempts < max_attempts:
+                time.sleep(2 ** (result.attempts - 1))
+            continue
+
+        result.status = response.status_code
+        if response.status_code == 200:
+            result.ok = True
+            result.error = None
+            break
+
+        if response.status_code == 429:
+            # Flood control áp cho cả bot: dừng mọi lần gửi trong retry_after giây
+            wait = _retry_after(response)
+            result.error = f"rate limited, retry after {wait}s"
+            _global_bucket.pause(wait)
+            chat_bucket.pause(wait)
+            continue
+
+        result.error = response.text[:200]
+        if response.status_code < 500:
+            # Lỗi phía người nhận (chặn bot, chat không tồn tại, ...): thử lại cũng vô ích
+            break
+        if result.attempts < max_attempts:
+            time.sleep(2 ** (result.attempts - 1))
+
+    metrics.inc("goldbot_broadcast_messages_total", result="delivered" if result.ok else "failed")
+    return result
+
+
+def send_messages(messages, parse_mode="MarkdownV2", max_workers=None, max_attempts=None):
+    """
+    Gửi tin nhắn riêng cho từng chat (dict chat_id -> message) song song, với cùng giới hạn
+    tốc độ và cách thử lại như broadcast. Trả về dict chat_id -> DeliveryResult.
+    """
+    messages = {str(c).strip(): m for c, m in messages.items() if str(c).strip()}
+    if not messages:
+        return {}
+
+    attempts = max_attempts or BROADCAST_MAX_ATTEMPTS
+    workers = min(max_workers or BROADCAST_MAX_WORKERS, len(messages))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="broadcast") as executor:
+        futures = {
+            chat_id: executor.submit(_deliver, chat_id, message, parse_mode, attempts)
+            for chat_id, message in messages.items()
+        }
+        results = {chat_id: future.result() for chat_id, future in futures.items()}
+
+    for r in results.values():
+        if not r.ok:
+            print(f"Failed to deliver to {r.chat_id} after {r.attempts} attempts: {r.status} {r.error}")
+    return results
+
+
+def broadcast(message, chat_ids, parse_mode="MarkdownV2", max_workers=None, max_attempts=None):
+    """
+    Gửi cùng một tin nhắn tới nhiều chat song song, tuân theo giới hạn tốc độ của Telegram
+    (toàn cục và theo từng chat) và retry_after khi bị 429.
+
+    Trả về dict chat_id -> DeliveryResult.
+    """
+    chat_ids = list(dict.fromkeys(str(c).strip() for c in chat_ids if str(c).strip()))
+    if not chat_ids:
+        return {}
+
+    print(f"Broadcasting message to {len(chat_ids)} chats...")
+    results = send_messages(
+        {chat_id: message for chat_id in chat_ids},
+        parse_mode=parse_mode,
+        max_workers=max_workers,
+        max_attempts=max_attempts,
+    )
+    delivered = sum(1 for r in results.values() if r.ok)
+    print(f"Broadcast finished: {delivered}/{len(results)} delivered.")
+    return results
+
+
+metrics.describe("goldbot_broadcast_messages_total", "Broadcast deliveries by result.")
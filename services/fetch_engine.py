@@ -0,0 +1,46 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def run_concurrently(jobs, max_workers=None, deadline=None, deadlines=None):
+    """
+    Chạy song song các job (dict name -> callable không tham số).
+
+    Trả về dict name -> kết quả. Job nào lỗi hoặc chưa xong khi hết hạn
+    (giây, `deadlines[name]` nếu có, ngược lại `deadline`) thì không có mặt
+    trong kết quả, các job khác không bị ảnh hưởng.
+    """
+    if not jobs:
+        return {}
+
+    workers = max_workers or len(jobs)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch")
+    try:
+        started = time.monotonic()
+        futures = {executor.submit(job): name for name, job in jobs.items()}
+        limits = {f: (deadlines or {}).get(name, deadline) for f, name in futures.items()}
+        pending = set(futures)
+        results = {}
+
+        while pending:
+            elapsed = time.monotonic() - started
+            expired = {f for f in pending if limits[f] is not None and elapsed >= limits[f]}
+            for future in expired:
+                print(f"Job '{futures[future]}' did not finish within {limits[future]}s; skipped.")
+            pending -= expired
+            if not pending:
+                break
+
+            remaining = [limits[f] - elapsed for f in pending if limits[f] is not None]
+            done, pending = wait(pending, timeout=min(remaining) if remaining else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    print(f"Job '{name}' failed: {e}")
+
+        return results
+    finally:
+        # Không chờ các job chậm: kết quả của chúng đã bị bỏ qua
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,108 +1,178 @@
+import dataclasses
 import re
+import time
 import requests
-from bs4 import BeautifulSoup
-from config import BTMC_URL, DOMESTIC_URL, INTERNATIONAL_URL, TIMEOUT
+from bs4 import BeautifulSoup, SoupStrainer
+from config import BTMC_URL, DOMESTIC_URL, INTERNATIONAL_URL
+from models.price_quote import PriceQuote, parse_amount, parse_signed_number
+from services import page_cache
 from services.vnd_usd_converter import USDVNDConverter
 
+# Dùng chung một converter (và cache tỷ giá) cho mọi lần fetch
+_converter = USDVNDConverter()
+
+# Vùng HTML chứa bảng giá của từng trang, dùng để nhận biết trang không đổi
+DOMESTIC_REGION = (b'cate-24h-gold-pri-table', b'</table>')
+INTERNATIONAL_REGION = (b'border-b border-ktc-borders', b'CommodityPrice', b'</div>')
+BTMC_REGION = (b'bd_price_home', b'</table>')
+
+# Phần tử (tag, class) chứa bảng giá: parse tìm phần tử này, tải stream ngừng khi nó đóng
+DOMESTIC_TARGET = ('div', 'cate-24h-gold-pri-table')
+BTMC_TARGET = ('table', 'bd_price_home')
+
+try:
+    import lxml  # noqa: F401
+    TARGETED_PARSER = "lxml"
+except ImportError:
+    TARGETED_PARSER = "html.parser"
+
+BROWSER_HEADERS = {
+    "Content-Type": "application/json",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+def find_region(content, name, class_):
+    """
+    Tìm phần tử `name` có class `class_` mà chỉ dựng cây con của nó (SoupStrainer,
+    dùng lxml nếu có cài). Nếu cách này không tìm thấy thì parse cả trang như trước.
+    """
+    strainer = SoupStrainer(name, class_=class_)
+    element = BeautifulSoup(content, TARGETED_PARSER, parse_only=strainer).find(name, class_=class_)
+    if element is not None:
+        return element
+
+    print(f"Targeted parse found no <{name} class='{class_}'>; falling back to full parse.")
+    return BeautifulSoup(content, 'html.parser').find(name, class_=class_)
+
+
 def fetch_domestic_gold_prices():
     """
     Lấy dữ liệu giá vàng từ URL được cấu hình.
     Trả về bộ (buy_trend, data_list).
     - buy_trend: 'increase', 'decrease', hoặc None (nếu không xác định)
-    - data_list: danh sách các row dữ liệu dạng [Loại, Mua, Bán]
+    - data_list: danh sách PriceQuote (source="domestic")
     """
     print("Fetching domestic gold prices...")
     try:
-        response = requests.get(DOMESTIC_URL, timeout=TIMEOUT)
-        response.raise_for_status()
-        print("Successfully fetched data from website.")
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        table = soup.find('div', {'class': 'cate-24h-gold-pri-table'})
-        if not table:
-            print("No data table found.")
-            return "Không tìm thấy dữ liệu giá vàng.", []
-
-        rows = table.find('table', {'class': 'gia-vang-search-data-table'})
-        if not rows:
-            print("No rows found in the data table.")
-            return "Không tìm thấy bảng giá vàng.", []
-
-        data = []
-        buy_trend = None  # 'increase' hoặc 'decrease'
-
-        for row in rows.find_all('tr'):
-            cols = row.find_all('td')
-            if len(cols) >= 3:
-                # Lấy giá mua
-                buy_price_span = cols[1].find('span', {'class': 'fixW'})
-                if not buy_price_span:
-                    continue
-                buy_price = buy_price_span.text.strip()
-
-                buy_change_span = cols[1].find('span', {'class': ['colorGreen', 'colorRed']})
-                if buy_change_span:
-                    buy_change = buy_change_span.text.strip()
-                    if not buy_change:
-                        buy_change = ""
-                        buy_symbol = ""
-                    elif 'colorGreen' in buy_change_span['class']:
-                        buy_symbol = "▲"
-                    elif 'colorRed' in buy_change_span['class']:
-                        buy_symbol = "▼"
-                    else:
-                        buy_symbol = ""
-                else:
+        fetched_at = time.time()
+        buy_trend, data = page_cache.fetch_parsed(
+            DOMESTIC_URL,
+            parse_domestic_page,
+            DOMESTIC_REGION,
+            is_valid=lambda result: bool(result[1]),
+            source="domestic",
+            stream_target=DOMESTIC_TARGET,
+        )
+        if data:
+            data = _stamp(data, fetched_at)
+            print(f"Buy trend: {buy_trend}")
+            print("Data fetched successfully.")
+        return buy_trend, data
+
+    except requests.RequestException as e:
+        print(f"Error connecting to the website: {e}")
+        return f"Lỗi khi kết nối đến trang web: {e}", []
+
+
+def _signed_change(change, symbol):
+    """'500' + '▼' -> -500000 (VND); None nếu không có mũi tên tăng/giảm."""
+    amount = parse_amount(change)
+    if amount is None or not symbol:
+        return None
+    return -amount if symbol == "▼" else amount
+
+
+def _stamp(quotes, fetched_at):
+    """Gán thời điểm fetch (kể cả khi dữ liệu lấy lại từ page cache)."""
+    return [dataclasses.replace(q, timestamp=fetched_at) for q in quotes]
+
+
+def parse_domestic_page(content):
+    """Parse trang giá vàng 24h.com.vn, trả về (buy_trend, data_list) như fetch_domestic_gold_prices."""
+    table = find_region(content, *DOMESTIC_TARGET)
+    if not table:
+        print("No data table found.")
+        return "Không tìm thấy dữ liệu giá vàng.", []
+
+    rows = table.find('table', {'class': 'gia-vang-search-data-table'})
+    if not rows:
+        print("No rows found in the data table.")
+        return "Không tìm thấy bảng giá vàng.", []
+
+    data = []
+    buy_trend = None  # 'increase' hoặc 'decrease'
+
+    for row in rows.find_all('tr'):
+        cols = row.find_all('td')
+        if len(cols) >= 3:
+            # Lấy giá mua
+            buy_price_span = cols[1].find('span', {'class': 'fixW'})
+            if not buy_price_span:
+                continue
+            buy_price = buy_price_span.text.strip()
+
+            buy_change_span = cols[1].find('span', {'class': ['colorGreen', 'colorRed']})
+            if buy_change_span:
+                buy_change = buy_change_span.text.strip()
+                if not buy_change:
                     buy_change = ""
                     buy_symbol = ""
-
-                # Lấy giá bán
-                sell_price_span = cols[2].find('span', {'class': 'fixW'})
-                if not sell_price_span:
-                    continue
-                sell_price = sell_price_span.text.strip()
-
-                sell_change_span = cols[2].find('span', {'class': ['colorGreen', 'colorRed']})
-                if sell_change_span:
-                    sell_change = sell_change_span.text.strip()
-                    if not sell_change:
-                        sell_change = ""
-                        sell_symbol = ""
-                    elif 'colorGreen' in sell_change_span['class']:
-                        sell_symbol = "▲"
-                    elif 'colorRed' in sell_change_span['class']:
-                        sell_symbol = "▼"
-                    else:
-                        sell_symbol = ""
+                elif 'colorGreen' in buy_change_span['class']:
+                    buy_symbol = "▲"
+                elif 'colorRed' in buy_change_span['class']:
+                    buy_symbol = "▼"
                 else:
+                    buy_symbol = ""
+            else:
+                buy_change = ""
+                buy_symbol = ""
+
+            # Lấy giá bán
+            sell_price_span = cols[2].find('span', {'class': 'fixW'})
+            if not sell_price_span:
+                continue
+            sell_price = sell_price_span.text.strip()
+
+            sell_change_span = cols[2].find('span', {'class': ['colorGreen', 'colorRed']})
+            if sell_change_span:
+                sell_change = sell_change_span.text.strip()
+                if not sell_change:
                     sell_change = ""
                     sell_symbol = ""
+                elif 'colorGreen' in sell_change_span['class']:
+                    sell_symbol = "▲"
+                elif 'colorRed' in sell_change_span['class']:
+                    sell_symbol = "▼"
+                else:
+                    sell_symbol = ""
+            else:
+                sell_change = ""
+                sell_symbol = ""
 
-                # Xác định xu hướng mua (buy_trend) nếu chưa có
-                if buy_trend is None and buy_symbol:
-                    if buy_symbol == "▲":
-                        buy_trend = "increase"
-                    elif buy_symbol == "▼":
-                        buy_trend = "decrease"
-                    else:
-                        buy_trend = "still"
-
-                # Ghép giá và xu hướng
-                buy_price_full = f"{buy_price} {buy_symbol}{buy_change}".strip()
-                sell_price_full = f"{sell_price} {sell_symbol}{sell_change}".strip()
+            # Xác định xu hướng mua (buy_trend) nếu chưa có
+            if buy_trend is None and buy_symbol:
+                if buy_symbol == "▲":
+                    buy_trend = "increase"
+                elif buy_symbol == "▼":
+                    buy_trend = "decrease"
+                else:
+                    buy_trend = "still"
 
-                # Lấy tên loại vàng
-                gold_type = cols[0].text.strip()
+            # Lấy tên loại vàng
+            gold_type = cols[0].text.strip()
 
-                data.append([gold_type, buy_price_full, sell_price_full])
+            data.append(PriceQuote(
+                source="domestic",
+                gold_type=gold_type,
+                buy=parse_amount(buy_price),
+                sell=parse_amount(sell_price),
+                buy_change=_signed_change(buy_change, buy_symbol),
+                sell_change=_signed_change(sell_change, sell_symbol),
+            ))
 
-        print(f"Buy trend: {buy_trend}")
-        print("Data fetched successfully.")
-        return buy_trend, data
+    return buy_trend, data
 
-    except requests.RequestException as e:
-        print(f"Error connecting to the website: {e}")
-        return f"Lỗi khi kết nối đến trang web: {e}", []
 
 def fetch_international_gold_prices():
     """
@@ -114,42 +184,26 @@ def fetch_international_gold_prices():
     """
     print("Fetching international gold prices...")
     try:
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(INTERNATIONAL_URL, timeout=TIMEOUT, headers=headers)
-        response.raise_for_status()
-        print("Successfully fetched data from website.")
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        current_price_panel = soup.find('div', class_='border-b border-ktc-borders')
-        if not current_price_panel:
-            print("No current price panel found.")
-            return "Không tìm thấy bảng giá hiện tại.", None, None, None
-
-        current_price_element = current_price_panel.find('h3')
-        if current_price_element is None:
-            print("No current price found.")
-            return "Không tìm thấy giá hiện tại.", None, None, None
-
-        current_price_in_usd = current_price_element.get_text()
-        current_price_in_usd = current_price_in_usd.replace(",", "")
-
-        converter = USDVNDConverter()
-
-        current_price_in_vnd = converter.convert_usd_to_vnd(float(current_price_in_usd))
-        if current_price_in_vnd is not None:
-            current_price_in_vnd /= 0.829 # convert from ounce to Tael
-
-        exchange_rate_to_vnd = converter.get_exchange_rate()
+        current_price_in_usd, change, err = page_cache.fetch_parsed(
+            INTERNATIONAL_URL,
+            parse_international_page,
+            INTERNATIONAL_REGION,
+            is_valid=lambda result: not result[2],
+            headers=BROWSER_HEADERS,
+            source="international",
+        )
+        if current_price_in_usd is None:
+            return err, None, None, None
 
-        change_element = current_price_element.find_next_sibling('div', class_=re.compile("CommodityPrice"))
-        if change_element is None:
-            print("No change element found.")
-            return "Không tìm thấy thay đổi giá.", None, current_price_in_vnd, exchange_rate_to_vnd
+        # Lấy tỷ giá một lần rồi tự quy đổi, tránh gọi nguồn tỷ giá hai lần
+        exchange_rate_to_vnd = _converter.get_exchange_rate()
+        current_price_in_vnd = None
+        if exchange_rate_to_vnd is not None:
+            current_price_in_vnd = float(current_price_in_usd) * exchange_rate_to_vnd
+            current_price_in_vnd /= 0.829 # convert from ounce to Tael
 
-        change = change_element.get_text()
+        if change is None:
+            return err, None, current_price_in_vnd, exchange_rate_to_vnd
 
         return current_price_in_usd, change, current_price_in_vnd, exchange_rate_to_vnd
     except requests.RequestException as e:
@@ -159,58 +213,125 @@ def fetch_international_gold_prices():
         print(f"Error parsing international gold prices: {e}")
         return f"Lỗi khi lấy dữ liệu giá vàng quốc tế: {e}", None, None, None
 
+
+def make_international_quote(current_price_in_usd, change, current_price_in_vnd, exchange_rate_to_vnd):
+    """
+    Dòng giá quốc tế quy đổi ra VND/lượng (kể cả thay đổi giá), để so sánh được với giá trong nước.
+    Trả về None nếu chưa có tỷ giá.
+    """
+    if current_price_in_vnd is None or exchange_rate_to_vnd is None:
+        return None
+
+    change_in_usd = parse_signed_number(change)
+    change_in_vnd = None
+    if change_in_usd is not None:
+        change_in_vnd = round(change_in_usd * exchange_rate_to_vnd / 0.829)
+
+    price_in_vnd = round(current_price_in_vnd)
+    return PriceQuote(
+        source="international",
+        gold_type="XAU",
+        buy=price_in_vnd,
+        sell=price_in_vnd,
+        buy_change=change_in_vnd,
+        sell_change=change_in_vnd,
+    )
+
+
+def parse_international_page(content):
+    """
+    Parse trang giá vàng kitco.
+    Trả về (current_price_in_usd, change, err); giá trị không lấy được là None, err rỗng nếu thành công.
+    """
+    current_price_panel = find_region(content, 'div', 'border-b border-ktc-borders')
+    if not current_price_panel:
+        print("No current price panel found.")
+        return None, None, "Không tìm thấy bảng giá hiện tại."
+
+    current_price_element = current_price_panel.find('h3')
+    if current_price_element is None:
+        print("No current price found.")
+        return None, None, "Không tìm thấy giá hiện tại."
+
+    current_price_in_usd = current_price_element.get_text()
+    current_price_in_usd = current_price_in_usd.replace(",", "")
+
+    change_element = current_price_element.find_next_sibling('div', class_=re.compile("CommodityPrice"))
+    if change_element is None:
+        print("No change element found.")
+        return current_price_in_usd, None, "Không tìm thấy thay đổi giá."
+
+    return current_price_in_usd, change_element.get_text(), ""
+
+
 def fetch_btmc_gold_prices():
+    """
+    Lấy bảng giá vàng BTMC.
+    Trả về bộ (data_list, status, err): danh sách PriceQuote (source="btmc"),
+    xu hướng ('increase', 'decrease', 'still' hoặc "") và thông báo lỗi ("" nếu thành công).
+    """
     print("Fetching BTMC Gold Prices...")
     try:
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(BTMC_URL, timeout=TIMEOUT, headers=headers)
-        response.raise_for_status()
-        print("Successfully fetched data from website.")
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        price_table = soup.find('table', class_='bd_price_home')
-        if not price_table:
-            print("No current price panel found.")
-            return [], "", "Không tìm thấy bảng giá hiện tại"
-
-        table_rows = price_table.find_all('tr')
-        if len(table_rows) < 2:
-            print("No rows found in the data table.")
-            return [], "", "Không tìm thấy bảng giá hiện tại"
-
-        data = []
-        status = ""
-        for row in table_rows[1:]:
-            shift = 0
-            cols = row.find_all('td')
-            if cols[0].get_attribute_list('rowspan'):
-                shift = 1
-            gold_type = cols[0+shift].get_text().strip()
-            buy_price = cols[2+shift].get_text().strip()
-            sell_price = cols[3+shift].get_text().strip()
-            if status == "":
-                try:
-                    status_img_src = cols[4+shift].find('img').get_attribute_list('src')[0]
-                    if "right_arrow" in status_img_src:
-                        status = "still"
-                    elif "up_arrow" in status_img_src:
-                        status = "increase"
-                    elif "down_arrow" in status_img_src:
-                        status = "decrease"
-                except Exception as e:
-                    # i dont need ya then
-                    print(e)
-                    pass
-
-            data.append([gold_type, buy_price, sell_price])
-
-        return data, status, ""
+        fetched_at = time.time()
+        data, status, err = page_cache.fetch_parsed(
+            BTMC_URL,
+            parse_btmc_page,
+            BTMC_REGION,
+            is_valid=lambda result: not result[2],
+            headers=BROWSER_HEADERS,
+            source="btmc",
+            stream_target=BTMC_TARGET,
+        )
+        return _stamp(data, fetched_at), status, err
     except requests.RequestException as e:
         print(f"Error connecting to the website: {e}")
         return [], "", f"Lỗi khi kết nối đến trang web: {e}"
     except Exception as e:
         print(f"Error parsing BTMC gold prices: {e}")
         return [], "", f"Lỗi khi lấy dữ liệu BTMC: {e}"
+
+
+def parse_btmc_page(content):
+    """Parse trang chủ btmc.vn, trả về (data, status, err) như fetch_btmc_gold_prices."""
+    price_table = find_region(content, *BTMC_TARGET)
+    if not price_table:
+        print("No current price panel found.")
+        return [], "", "Không tìm thấy bảng giá hiện tại"
+
+    table_rows = price_table.find_all('tr')
+    if len(table_rows) < 2:
+        print("No rows found in the data table.")
+        return [], "", "Không tìm thấy bảng giá hiện tại"
+
+    data = []
+    status = ""
+    for row in table_rows[1:]:
+        shift = 0
+        cols = row.find_all('td')
+        if cols[0].get_attribute_list('rowspan'):
+            shift = 1
+        gold_type = cols[0+shift].get_text().strip()
+        buy_price = cols[2+shift].get_text().strip()
+        sell_price = cols[3+shift].get_text().strip()
+        if status == "":
+            try:
+                status_img_src = cols[4+shift].find('img').get_attribute_list('src')[0]
+                if "right_arrow" in status_img_src:
+                    status = "still"
+                elif "up_arrow" in status_img_src:
+                    status = "increase"
+                elif "down_arrow" in status_img_src:
+                    status = "decrease"
+            except Exception as e:
+                # i dont need ya then
+                print(e)
+                pass
+
+        data.append(PriceQuote(
+            source="btmc",
+            gold_type=gold_type,
+            buy=parse_amount(buy_price),
+            sell=parse_amount(sell_price),
+        ))
+
+    return data, status, ""
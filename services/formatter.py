@@ -1,28 +1,14 @@
 import textwrap
 
-def _split_price_and_change(value):
-    v = (value or "").strip()
-    if not v:
-        return "", ""
+from models.price_quote import format_amount, format_change
 
-    v = " ".join(v.split())
-
-    if "▲" in v:
-        price, rest = v.split("▲", 1)
-        return price.strip(), ("▲" + rest.strip()).replace(" ", "")
-    if "▼" in v:
-        price, rest = v.split("▼", 1)
-        return price.strip(), ("▼" + rest.strip()).replace(" ", "")
-
-    parts = v.split(" ")
-    if len(parts) >= 2 and parts[-1][:1] in ("+", "-"):
-        return " ".join(parts[:-1]).strip(), parts[-1].strip()
-
-    return v, ""
+# Độ rộng cột (Loại, Mua, Bán) cho màn hình hẹp (điện thoại)
+DOMESTIC_NARROW_WIDTHS = (7, 7, 7)
+BTMC_NARROW_WIDTHS = (8, 6, 6)
 
 
 def format_domestic_data(data, buy_trend, col_widths=(10, 7, 7)):
-    """Format danh sách dữ liệu giá vàng dưới dạng bảng (code block)."""
+    """Format danh sách PriceQuote giá vàng trong nước dưới dạng bảng (code block)."""
     print("Formatting data as code block...")
 
     type_width, buy_width, sell_width = col_widths
@@ -43,22 +29,13 @@ def format_domestic_data(data, buy_trend, col_widths=(10, 7, 7)):
         line,
     ]
 
-    for row in data:
-        gold_type = (row[0] if len(row) > 0 else "")
-        buy_value = row[1] if len(row) > 1 else ""
-        sell_value = row[2] if len(row) > 2 else ""
-
-        gold_type = (gold_type or "").strip()
-        buy_price, buy_change = _split_price_and_change(buy_value)
-        sell_price, sell_change = _split_price_and_change(sell_value)
-
-        buy_price = "LH" if buy_price.lower() == "liên hệ" else buy_price
-        sell_price = "LH" if sell_price.lower() == "liên hệ" else sell_price
+    for quote in data:
+        gold_type = (quote.gold_type or "").strip()
 
-        buy_price = (buy_price or "")[:buy_width]
-        sell_price = (sell_price or "")[:sell_width]
-        buy_change = (buy_change or "")[:buy_width]
-        sell_change = (sell_change or "")[:sell_width]
+        buy_price = format_amount(quote.buy)[:buy_width]
+        sell_price = format_amount(quote.sell)[:sell_width]
+        buy_change = format_change(quote.buy_change)[:buy_width]
+        sell_change = format_change(quote.sell_change)[:sell_width]
 
         wrapped_type = textwrap.wrap(gold_type, width=type_width) or [""]
         for i, type_line in enumerate(wrapped_type):
@@ -74,8 +51,10 @@ def format_domestic_data(data, buy_trend, col_widths=(10, 7, 7)):
     print("Data formatted successfully.")
     return "\n".join(table)
 
-def format_international_data(current_price_in_usd, change, current_price_in_vnd, exchange_rate_to_vnd):
+def format_international_data(current_price_in_usd, change, current_price_in_vnd, exchange_rate_to_vnd, markup="markdown"):
     def escape(text):
+        if markup != "markdown":
+            return text
         special_chars = r'_*\[\]()~`>#+-=|{}.!'
         return ''.join(['\\' + c if c in special_chars else c for c in text])
 
@@ -105,7 +84,7 @@ def format_international_data(current_price_in_usd, change, current_price_in_vnd
 
 def format_btmc_data(data, status, col_widths=(12, 6, 6)):
     """
-    Format danh sách dữ liệu giá vàng dưới dạng bảng (code block)
+    Format danh sách PriceQuote giá vàng BTMC dưới dạng bảng (code block)
     """
     print("Formatting data as code block...")
 
@@ -130,10 +109,10 @@ def format_btmc_data(data, status, col_widths=(12, 6, 6)):
         line,
     ]
 
-    for row in data:
-        gold_type = row[0]
-        buy_price = row[1]
-        sell_price = row[2]
+    for quote in data:
+        gold_type = quote.gold_type
+        buy_price = format_amount(quote.buy)
+        sell_price = format_amount(quote.sell)
 
         # Wrap the gold_type to the column width
         wrapped_type = textwrap.wrap(gold_type, width=type_width)
@@ -143,8 +122,6 @@ def format_btmc_data(data, status, col_widths=(12, 6, 6)):
             type_line = wrapped_type[i] if i < len(wrapped_type) else ""
             buy_line = buy_price if i == 0 else ""
             sell_line = sell_price if i == 0 else ""
-            buy_line = buy_line if buy_line.lower() != "liên hệ" else "LH"
-            sell_line = sell_line if sell_line.lower() != "liên hệ" else "LH"
             table.append(
                 f"| {type_line:<{type_width}} | {buy_line:<{buy_width}} | {sell_line:<{sell_width}} |"
             )
@@ -0,0 +1,392 @@
+import os
+import sqlite3
+import threading
+
+from config import HISTORY_DB_PATH
+from models.price_quote import OHLCBar, PriceQuote
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_history (
+    source TEXT NOT NULL,
+    gold_type TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    buy INTEGER,
+    sell INTEGER,
+    buy_change INTEGER,
+    sell_change INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_price_history_key
+    ON price_history (source, gold_type, timestamp);
+"""
+
+# Giá mở/cao/thấp/đóng theo giờ và theo ngày, cập nhật dần mỗi khi ghi giá (xem _apply_rollups)
+_OHLC_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_ohlc (
+    source TEXT NOT NULL,
+    gold_type TEXT NOT NULL,
+    side TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket REAL NOT NULL,
+    open_ts REAL NOT NULL,
+    open INTEGER NOT NULL,
+    high INTEGER NOT NULL,
+    low INTEGER NOT NULL,
+    close_ts REAL NOT NULL,
+    close INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (source, gold_type, side, resolution, bucket)
+) WITHOUT ROWID;
+"""
+
+# Độ dài mỗi khoảng rollup (giây). Ngày tính theo giờ Việt Nam (UTC+7, không có giờ mùa hè).
+RESOLUTIONS = {"hour": 3600, "day": 86400}
+SIDES = ("buy", "sell")
+_DAY_OFFSET = 7 * 3600
+
+# Ghi một giá vào khoảng của nó: khoảng mới thì tạo, có rồi thì chỉ cập nhật high/low,
+# open (nếu giá sớm hơn) và close (nếu giá muộn hơn), nên thứ tự ghi không quan trọng.
+_OHLC_UPSERT = """
+INSERT INTO price_ohlc
+    (source, gold_type, side, resolution, bucket, open_ts, open, high, low, close_ts, close, samples)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT (source, gold_type, side, resolution, bucket) DO UPDATE SET
+    open = CASE WHEN excluded.open_ts < open_ts THEN excluded.open ELSE open END,
+    open_ts = MIN(open_ts, excluded.open_ts),
+    high = MAX(high, excluded.high),
+    low = MIN(low, excluded.low),
+    close = CASE WHEN excluded.close_ts >= close_ts THEN excluded.close ELSE close END,
+    close_ts = MAX(close_ts, excluded.close_ts),
+    samples = samples + 1
+"""
+
+_COLUMNS = "source, gold_type, timestamp, buy, sell, buy_change, sell_change"
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized_paths = set()
+
+
+def _connect(path=None):
+    """Mỗi luồng giữ một kết nối SQLite riêng (WAL cho phép đọc song song với ghi)."""
+    path = path or HISTORY_DB_PATH
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with _init_lock:
+            if path not in _initialized_paths:
+                conn.executescript(_SCHEMA)
+                has_rollups = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'price_ohlc'"
+                ).fetchone()
+                conn.executescript(_OHLC_SCHEMA)
+                if not has_rollups:
+                    # Cơ sở dữ liệu tạo trước khi có rollup: dựng lại một lần từ dữ liệu gốc
+                    _rebuild_rollups(conn)
+                _initialized_paths.add(path)
+        connections[path] = conn
+    return conn
+
+
+def bucket_start(timestamp, resolution):
+    """Thời điểm bắt đầu khoảng `resolution` ('hour' hoặc 'day') chứa `timestamp`."""
+    size = RESOLUTIONS[resolution]
+    offset = _DAY_OFFSET if resolution == "day" else 0
+    return (timestamp + offset) // size * size - offset
+
+
+def _apply_rollups(conn, rows, resolutions=tuple(RESOLUTIONS)):
+    """Cập nhật rollup OHLC cho các dòng (source, gold_type, timestamp, buy, sell, ...) vừa ghi."""
+    updates = []
+    for source, gold_type, timestamp, buy, sell, *_ in rows:
+        for side, price in (("buy", buy), ("sell", sell)):
+            if price is None:
+                continue
+            for resolution in resolutions:
+                updates.append((
+                    source, gold_type, side, resolution, bucket_start(timestamp, resolution),
+                    timestamp, price, price, price, timestamp, price,
+                ))
+    if updates:
+        conn.executemany(_OHLC_UPSERT, updates)
+
+
+def _refresh_rollups(conn, rows):
+    """
+    Tính lại từ price_history các khoảng rollup chứa `rows`: dùng sau khi dữ liệu gốc bị
+    xoá/ghi lại, khi cộng dồn lên rollup cũ sẽ làm sai samples và open/high/low/close.
+    """
+    buckets = {
+        (source, gold_type, resolution, bucket_start(timestamp, resolution))
+        for source, gold_type, timestamp, *_ in rows
+        for resolution in RESOLUTIONS
+    }
+    for source, gold_type, resolution, bucket in buckets:
+        conn.execute(
+            "DELETE FROM price_ohlc WHERE source = ? AND gold_type = ? AND resolution = ? AND bucket = ?",
+            (source, gold_type, resolution, bucket),
+        )
+        raw = conn.execute(
+            f"SELECT {_COLUMNS} FROM price_history"
+            " WHERE source = ? AND gold_type = ? AND timestamp >= ? AND timestamp < ?",
+            (source, gold_type, bucket, bucket + RESOLUTIONS[resolution]),
+        ).fetchall()
+        _apply_rollups(conn, raw, resolutions=(resolution,))
+
+
+def _rebuild_rollups(conn):
+    """
+    Tính lại price_ohlc từ price_history: đọc một lượt theo thứ tự của index
+    (source, gold_type, timestamp), nên giá đầu/cuối của mỗi khoảng là open/close.
+    """
+    bars = {}  # (source, gold_type, side, resolution, bucket) -> [open_ts, open, high, low, close_ts, close, samples]
+    cursor = conn.execute(
+        "SELECT source, gold_type, timestamp, buy, sell FROM price_history"
+        " ORDER BY source, gold_type, timestamp"
+    )
+    for source, gold_type, timestamp, buy, sell in cursor:
+        for side, price in (("buy", buy), ("sell", sell)):
+            if price is None:
+                continue
+            for resolution in RESOLUTIONS:
+                key = (source, gold_type, side, resolution, bucket_start(timestamp, resolution))
+                bar = bars.get(key)
+                if bar is None:
+                    bars[key] = [timestamp, price, price, price, timestamp, price, 1]
+                else:
+                    if price > bar[2]:
+                        bar[2] = price
+                    if price < bar[3]:
+                        bar[3] = price
+                    bar[4], bar[5] = timestamp, price
+                    bar[6] += 1
+
+    conn.execute("DELETE FROM price_ohlc")
+    conn.executemany(
+        "INSERT INTO price_ohlc"
+        " (source, gold_type, side, resolution, bucket, open_ts, open, high, low, close_ts, close, samples)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (key + tuple(bar) for key, bar in bars.items()),
+    )
+    conn.commit()
+    if bars:
+        print(f"Rebuilt {len(bars)} OHLC rollup rows from price history.")
+
+
+def rebuild_rollups(path=None):
+    """Tính lại toàn bộ rollup OHLC từ price_history (vd. sau khi sửa dữ liệu gốc bằng tay)."""
+    conn = _connect(path)
+    with conn:
+        _rebuild_rollups(conn)
+
+
+def _to_quote(row):
+    source, gold_type, timestamp, buy, sell, buy_change, sell_change = row
+    return PriceQuote(
+        source=source,
+        gold_type=gold_type,
+        buy=buy,
+        sell=sell,
+        buy_change=buy_change,
+        sell_change=sell_change,
+        timestamp=timestamp,
+    )
+
+
+def record_quotes(quotes, path=None):
+    """Ghi một lô PriceQuote trong một transaction. Trả về số dòng đã ghi."""
+    rows = [
+        (q.source, q.gold_type, q.timestamp, q.buy, q.sell, q.buy_change, q.sell_change)
+        for q in quotes
+    ]
+    if not rows:
+        return 0
+
+    conn = _connect(path)
+    with conn:
+        conn.executemany(
+            f"INSERT INTO price_history ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        _apply_rollups(conn, rows)
+    return len(rows)
+
+
+def replace_quotes(quotes, path=None):
+    """
+    Như record_quotes, nhưng trước đó xoá các dòng cùng (source, gold_type, timestamp)
+    trong cùng transaction: ghi lại cùng dữ liệu (vd. backfill chạy lại) không tạo dòng trùng.
+    Các khoảng rollup chứa các dòng này được tính lại từ dữ liệu gốc.
+    """
+    rows = [
+        (q.source, q.gold_type, q.timestamp, q.buy, q.sell, q.buy_change, q.sell_change)
+        for q in quotes
+    ]
+    if not rows:
+        return 0
+
+    conn = _connect(path)
+    with conn:
+        conn.executemany(
+            "DELETE FROM price_history WHERE source = ? AND gold_type = ? AND timestamp = ?",
+            [row[:3] for row in rows],
+        )
+        conn.executemany(
+            f"INSERT INTO price_history ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        _refresh_rollups(conn, rows)
+    return len(rows)
+
+
+def query_range(source, gold_type=None, start=None, end=None, limit=None, path=None):
+    """Các dòng giá của một nguồn (và loại vàng) trong [start, end], sắp theo thời gian tăng dần."""
+    sql = f"SELECT {_COLUMNS} FROM price_history WHERE source = ?"
+    params = [source]
+    if gold_type is not None:
+        sql += " AND gold_type = ?"
+        params.append(gold_type)
+    if start is not None:
+        sql += " AND timestamp >= ?"
+        params.append(start)
+    if end is not None:
+        sql += " AND timestamp <= ?"
+        params.append(end)
+    sql += " ORDER BY timestamp"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    return [_to_quote(row) for row in _connect(path).execute(sql, params)]
+
+
+def query_columns(source, start=None, end=None, bucket=None, path=None):
+    """
+    Các bộ (gold_type, timestamp, buy, sell, count) của một nguồn trong [start, end], sắp theo
+    loại vàng rồi thời gian; dạng thô để nạp thẳng vào mảng (xem services.analytics).
+
+    Với `bucket` (giây), mỗi loại vàng chỉ giữ dòng cuối cùng của mỗi khoảng `bucket` giây
+    (count là số dòng gốc trong khoảng), để SQLite không phải trả về từng dòng của dữ liệu dày.
+    """
+    if bucket:
+        # SQLite lấy các cột không gộp từ đúng dòng có MAX(timestamp)
+        sql = (
+            "SELECT gold_type, MAX(timestamp), buy, sell, COUNT(*) FROM price_history"
+            " WHERE source = ?"
+        )
+    else:
+        sql = "SELECT gold_type, timestamp, buy, sell, 1 FROM price_history WHERE source = ?"
+    params = [source]
+    if start is not None:
+        sql += " AND timestamp >= ?"
+        params.append(start)
+    if end is not None:
+        sql += " AND timestamp <= ?"
+        params.append(end)
+    if bucket:
+        sql += " GROUP BY gold_type, CAST(timestamp / ? AS INTEGER)"
+        params.append(bucket)
+    sql += " ORDER BY gold_type, 2"
+    return _connect(path).execute(sql, params).fetchall()
+
+
+def query_ohlc(source, gold_type, resolution="hour", side="buy", start=None, end=None, limit=None, path=None):
+    """
+    Các nến OHLC của một loại vàng, sắp theo thời gian tăng dần, đọc thẳng từ rollup.
+    start/end lọc theo thời điểm bắt đầu khoảng; limit giữ lại `limit` nến mới nhất.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    if side not in SIDES:
+        raise ValueError(f"Unknown price side: {side}")
+
+    sql = (
+        "SELECT bucket, open, high, low, close, samples FROM price_ohlc"
+        " WHERE source = ? AND gold_type = ? AND side = ? AND resolution = ?"
+    )
+    params = [source, gold_type, side, resolution]
+    if start is not None:
+        sql += " AND bucket >= ?"
+        params.append(bucket_start(start, resolution))
+    if end is not None:
+        sql += " AND bucket <= ?"
+        params.append(end)
+    sql += " ORDER BY bucket DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    rows = _connect(path).execute(sql, params).fetchall()
+    return [
+        OHLCBar(source, gold_type, side, resolution, bucket, open_, high, low, close, samples)
+        for bucket, open_, high, low, close, samples in reversed(rows)
+    ]
+
+
+def rollup_gold_types(source, path=None):
+    """Các loại vàng của một nguồn đã có rollup."""
+    rows = _connect(path).execute(
+        "SELECT DISTINCT gold_type FROM price_ohlc WHERE source = ? ORDER BY gold_type",
+        (source,),
+    )
+    return [row[0] for row in rows]
+
+
+def latest(source, gold_type, n=1, path=None):
+    """N dòng giá mới nhất của một loại vàng, mới nhất trước."""
+    rows = _connect(path).execute(
+        f"SELECT {_COLUMNS} FROM price_history"
+        " WHERE source = ? AND gold_type = ? ORDER BY timestamp DESC LIMIT ?",
+        (source, gold_type, n),
+    )
+    return [_to_quote(row) for row in rows]
+
+
+def latest_snapshot(source, path=None):
+    """Dòng giá mới nhất của từng loại vàng thuộc một nguồn."""
+    rows = _connect(path).execute(
+        f"SELECT {_COLUMNS} FROM price_history AS h"
+        " WHERE source = ? AND timestamp = ("
+        "   SELECT MAX(timestamp) FROM price_history"
+        "   WHERE source = h.source AND gold_type = h.gold_type"
+        " ) ORDER BY gold_type",
+        (source,),
+    )
+    return [_to_quote(row) for row in rows]
+
+
+def trend_from_history(quote, field="buy", path=None):
+    """
+    Xu hướng của `quote` so với lần giá gần nhất khác giá hiện tại trong lịch sử.
+
+    Trả về 'increase', 'decrease', 'still' (có lịch sử nhưng giá chưa từng khác),
+    hoặc None nếu chưa có lịch sử / không có giá.
+    """
+    if field not in ("buy", "sell"):
+        raise ValueError(f"Unknown price field: {field}")
+
+    current = getattr(quote, field)
+    if current is None:
+        return None
+
+    conn = _connect(path)
+    row = conn.execute(
+        f"SELECT {field} FROM price_history"
+        f" WHERE source = ? AND gold_type = ? AND {field} IS NOT NULL AND {field} != ?"
+        " ORDER BY timestamp DESC LIMIT 1",
+        (quote.source, quote.gold_type, current),
+    ).fetchone()
+    if row is not None:
+        return "increase" if current > row[0] else "decrease"
+
+    seen = conn.execute(
+        "SELECT 1 FROM price_history WHERE source = ? AND gold_type = ? LIMIT 1",
+        (quote.source, quote.gold_type),
+    ).fetchone()
+    return "still" if seen else None
@@ -0,0 +1,144 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from config import HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, STREAM_CHUNK_SIZE, TIMEOUT
+from services import metrics
+
+# ACCEPT_ENCODING của urllib3 tự thêm "br" khi đã cài brotli (có trong requirements.txt)
+DEFAULT_HEADERS = {"Accept-Encoding": ACCEPT_ENCODING}
+
+_session = None
+_session_lock = threading.Lock()
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Trả về requests.Session dùng chung cho cả tiến trình.
+
+    Mỗi host có một connection pool riêng (keep-alive), nên các request
+    tiếp theo tới cùng host không phải bắt tay TCP + TLS lại.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _session = session
+    return _session
+
+
+def request(method, url, **kwargs):
+    kwargs.setdefault("timeout", TIMEOUT)
+    response = get_session().request(method, url, **kwargs)
+    if not kwargs.get("stream"):
+        _record(url, response)
+    return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def get_until(url, done, chunk_size=STREAM_CHUNK_SIZE, **kwargs):
+    """
+    GET dạng stream: đưa từng chunk (đã giải nén) cho `done(chunk)` và ngừng tải
+    ngay khi nó trả về True. Trả về (response, content, stopped_early), trong đó
+    content là phần body đã nhận. Ngừng giữa chừng thì kết nối bị đóng thay vì
+    trả về pool. Response khác 200 được đọc hết như request thường.
+    """
+    response = request("GET", url, stream=True, **kwargs)
+    chunks = []
+    stopped_early = False
+    try:
+        if response.status_code == 200:
+            for chunk in response.iter_content(chunk_size):
+                chunks.append(chunk)
+                if done(chunk):
+                    stopped_early = True
+                    break
+        else:
+            chunks.append(response.content or b"")
+    finally:
+        content = b"".join(chunks)
+        _record(url, response, decoded_bytes=len(content))
+        if stopped_early:
+            response.close()
+    return response, content, stopped_early
+
+
+def _record(url, response, decoded_bytes=None):
+    host = urlsplit(url).netloc
+    try:
+        wire_bytes = response.raw.tell()
+    except Exception:
+        wire_bytes = 0
+    if decoded_bytes is None:
+        decoded_bytes = len(response.content or b"")
+    with _stats_lock:
+        entry = _stats.setdefault(host, {"requests": 0, "bytes_wire": 0, "bytes_decoded": 0})
+        entry["requests"] += 1
+        entry["bytes_wire"] += wire_bytes or 0
+        entry["bytes_decoded"] += decoded_bytes
+
+    metrics.inc("goldbot_http_requests_total", host=host, status=response.status_code)
+    metrics.inc("goldbot_http_response_bytes_total", wire_bytes or 0, host=host)
+    metrics.log_event(
+        "http",
+        method=response.request.method if response.request is not None else None,
+        host=host,
+        status=response.status_code,
+        bytes_wire=wire_bytes or 0,
+        bytes_decoded=decoded_bytes,
+        duration_ms=round(response.elapsed.total_seconds() * 1000, 2),
+    )
+
+
+def get_transport_stats():
+    """
+    Thống kê theo host: số request, số kết nối thực sự được mở,
+    số byte trên đường truyền (đã nén) và sau khi giải nén.
+    """
+    with _stats_lock:
+        stats = {host: dict(entry) for host, entry in _stats.items()}
+
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = getattr(adapter.poolmanager, "pools", None)
+            if pools is None:
+                continue
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+                entry = stats.setdefault(host, {"requests": 0, "bytes_wire": 0, "bytes_decoded": 0})
+                entry["connections"] = entry.get("connections", 0) + pool.num_connections
+
+    return stats
+
+
+def print_transport_stats():
+    for host, entry in sorted(get_transport_stats().items()):
+        print(
+            f"[http] {host}: requests={entry.get('requests', 0)} "
+            f"connections={entry.get('connections', 0)} "
+            f"bytes_wire={entry.get('bytes_wire', 0)} bytes_decoded={entry.get('bytes_decoded', 0)}"
+        )
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from services import history_store, metrics
+from services.telegram_webhook import MAX_BODY_BYTES
+
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
+TEXT_CONTENT_TYPE = "text/plain; charset=utf-8"
+OHLC_MAX_BARS = 1000  # số nến tối đa mỗi request /ohlc
+
+
+def snapshot_to_dict(snapshot):
+    return {
+        "source": snapshot.source,
+        "trend": snapshot.trend,
+        "fetched_at": snapshot.fetched_at,
+        "quotes": [quote.to_dict() for quote in snapshot.quotes],
+    }
+
+
+class PriceSnapshotStore:
+    """
+    Snapshot giá mới nhất trong bộ nhớ, kèm sẵn body đã render (JSON và text) và ETag
+    cho từng `type`, để mỗi request chỉ là một lần tra dict.
+    """
+
+    def __init__(self, available_types, compose_text):
+        self.available_types = list(available_types)
+        self.compose_text = compose_text
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._responses = {}  # (kind, type) -> (body, etag)
+        self._text_digests = {}  # type -> digest giá của body text đang phục vụ
+        self.updated_at = None
+
+    def update(self, snapshots):
+        """Thay snapshot của các nguồn lấy được; nguồn lỗi giữ snapshot cũ."""
+        with self._lock:
+            merged = dict(self._snapshots)
+        merged.update({t: s for t, s in snapshots.items() if s is not None})
+
+        responses, text_digests = {}, {}
+        for requested in self.available_types + ["all"]:
+            types = self.available_types if requested == "all" else [requested]
+            present = [t for t in types if t in merged]
+            if not present:
+                continue
+
+            payload = {t: snapshot_to_dict(merged[t]) for t in present}
+            json_body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            responses[("json", requested)] = (json_body, _etag(json_body))
+
+            # Tin nhắn text có kèm giờ hiện tại: giá không đổi thì giữ nguyên body và ETag cũ
+            digest = _price_digest([merged[t] for t in present])
+            previous = self._responses.get(("text", requested))
+            if previous is not None and self._text_digests.get(requested) == digest:
+                responses[("text", requested)] = previous
+            else:
+                text_body = self.compose_text(present, {t: merged[t] for t in present}).encode("utf-8")
+                responses[("text", requested)] = (text_body, f'"{digest}"')
+            text_digests[requested] = digest
+
+        with self._lock:
+            self._snapshots = merged
+            self._responses = responses
+            self._text_digests = text_digests
+            self.updated_at = time.time()
+
+    def response(self, kind, requested):
+        return self._responses.get((kind, requested))
+
+
+def _number_param(params, name, convert):
+    if name not in params:
+        return None
+    try:
+        return convert(params[name])
+    except ValueError:
+        raise ValueError(f"invalid '{name}': {params[name]!r}")
+
+
+def _etag(body):
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def _price_digest(snapshots):
+    """Hash của phần giá trong các snapshot (section, xu hướng, giá), bỏ qua thời điểm lấy."""
+    data = [
+        (s.source, s.trend, s.text, [(q.gold_type, q.buy, q.sell, q.buy_change, q.sell_change) for q in s.quotes])
+        for s in snapshots
+    ]
+    return hashlib.sha1(json.dumps(data, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class PriceRequestHandler(BaseHTTPRequestHandler):
+    store = None
+    max_age = 60
+    webhook = None  # WebhookReceiver, None nếu không bật webhook
+    webhook_path = None
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if self.webhook is None or url.path != self.webhook_path:
+            self._send(404, b"not found", TEXT_CONTENT_TYPE)
+            return
+
+        # Kiểm tra secret và kích thước trước khi đọc body; body không đọc thì không dùng lại kết nối
+        if not self.webhook.authorized(self.headers):
+            self.close_connection = True
+            self._send(401, b"", JSON_CONTENT_TYPE)
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            self.close_connection = True
+            metrics.inc("goldbot_webhook_updates_total", result="rejected")
+            self._send(413 if length > 0 else 400, b"", JSON_CONTENT_TYPE)
+            return
+
+        body = self.rfile.read(length) if length else b""
+        status = self.webhook.accept(self.headers, body)
+        self._send(status, b"{}" if status == 200 else b"", JSON_CONTENT_TYPE)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/prices":
+            self._serve_prices("json", url.query, JSON_CONTENT_TYPE)
+        elif url.path == "/prices.txt":
+            self._serve_prices("text", url.query, TEXT_CONTENT_TYPE)
+        elif url.path == "/ohlc":
+            self._serve_ohlc(url.query)
+        elif url.path == "/metrics":
+            self._send(200, render_metrics(), metrics.PROMETHEUS_CONTENT_TYPE)
+        elif url.path == "/healthz":
+            self._send(200, b"ok", TEXT_CONTENT_TYPE)
+        else:
+            self._send(404, b"not found", TEXT_CONTENT_TYPE)
+
+    def _serve_prices(self, kind, query, content_type):
+        requested = (parse_qs(query).get("type") or ["all"])[0].lower()
+        if requested != "all" and requested not in self.store.available_types:
+            choices = ", ".join(self.store.available_types + ["all"])
+            self._send(400, f"unknown type '{requested}'; expected one of: {choices}".encode("utf-8"), TEXT_CONTENT_TYPE)
+            return
+
+        cached = self.store.response(kind, requested)
+        if cached is None:
+            self._send(503, b"prices not available yet", TEXT_CONTENT_TYPE, {"Retry-After": "5"})
+            return
+
+        body, etag = cached
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={self.max_age}"}
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", content_type, headers)
+        else:
+            self._send(200, body, content_type, headers)
+
+    def _serve_ohlc(self, query):
+        """
+        GET /ohlc?source=domestic&type=SJC[&resolution=hour|day][&side=buy|sell][&start=&end=][&limit=]
+        Nến OHLC đọc thẳng từ rollup trong history store; start/end là unix timestamp.
+        """
+        params = {k: v[0] for k, v in parse_qs(query).items()}
+        source = params.get("source", "").lower()
+        gold_type = params.get("type")
+        try:
+            if source not in self.store.available_types:
+                raise ValueError(f"unknown source '{source}'; expected one of: {', '.join(self.store.available_types)}")
+            if not gold_type:
+                raise ValueError("missing 'type' (gold type, e.g. SJC)")
+            resolution = params.get("resolution", "hour")
+            side = params.get("side", "buy")
+            start = _number_param(params, "start", float)
+            end = _number_param(params, "end", float)
+            limit = _number_param(params, "limit", int)
+            if limit is not None and limit < 1:
+                raise ValueError(f"invalid 'limit': {limit} (must be at least 1)")
+            limit = min(limit or OHLC_MAX_BARS, OHLC_MAX_BARS)
+            bars = history_store.query_ohlc(source, gold_type, resolution, side, start=start, end=end, limit=limit)
+        except ValueError as e:
+            self._send(400, str(e).encode("utf-8"), TEXT_CONTENT_TYPE)
+            return
+
+        payload = {
+            "source": source,
+            "gold_type": gold_type,
+            "resolution": resolution,
+            "side": side,
+            "bars": [bar.to_dict() for bar in bars],
+        }
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send(200, body, JSON_CONTENT_TYPE, {"Cache-Control": f"public, max-age={self.max_age}"})
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)) if status != 304 else "0")
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def render_metrics():
+    return metrics.render_prometheus().encode("utf-8")
+
+
+def create_server(port, store, max_age, webhook=None, webhook_path=None, host="0.0.0.0"):
+    handler = type(
+        "BoundPriceRequestHandler",
+        (PriceRequestHandler,),
+        {"store": store, "max_age": max_age, "webhook": webhook, "webhook_path": webhook_path},
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
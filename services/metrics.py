@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from config import STRUCTURED_LOGS
+
+# Bucket (giây) cho histogram thời gian xử lý: từ vài ms (format) tới hàng chục giây (fetch chậm)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_lock = threading.Lock()
+_counters = {}  # name -> {labels_tuple: value}
+_histograms = {}  # name -> {labels_tuple: [bucket_counts, sum, count]}
+_help = {}
+
+
+def describe(name, text):
+    _help[name] = text
+
+
+def _key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def inc(name, value=1, **labels):
+    key = _key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    key = _key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        entry = series.get(key)
+        if entry is None:
+            entry = series[key] = [[0] * len(DEFAULT_BUCKETS), 0.0, 0]
+        for i, bound in enumerate(DEFAULT_BUCKETS):
+            if value <= bound:
+                entry[0][i] += 1
+        entry[1] += value
+        entry[2] += 1
+
+
+def log_event(event, **fields):
+    """Ghi một dòng log JSON (tắt được bằng STRUCTURED_LOGS=0)."""
+    if not STRUCTURED_LOGS:
+        return
+    record = {"ts": round(time.time(), 3), "event": event}
+    record.update(fields)
+    print(json.dumps(record, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def timed(stage, source=None, **fields):
+    """
+    Đo thời gian một bước (fetch, parse, format, send, ...) của một nguồn:
+    ghi vào histogram goldbot_stage_duration_seconds và log một dòng JSON.
+    """
+    started = time.perf_counter()
+    result = "ok"
+    try:
+        yield fields
+    except BaseException:
+        result = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        observe("goldbot_stage_duration_seconds", elapsed, stage=stage, source=source)
+        record = {"stage": stage, "source": source, "result": result, "duration_ms": round(elapsed * 1000, 2)}
+        record.update(fields)
+        log_event("stage", **record)
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + (list(extra) if extra else [])
+    if not pairs:
+        return ""
+    escaped = []
+    for k, v in pairs:
+        v = v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{k}="{v}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def render_prometheus():
+    """Xuất toàn bộ counter/histogram theo định dạng text của Prometheus."""
+    lines = []
+    with _lock:
+        for name in sorted(_counters):
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(_counters[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {value}")
+
+        for name in sorted(_histograms):
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, (buckets, total, count) in sorted(_histograms[name].items()):
+                for bound, bucket_count in zip(DEFAULT_BUCKETS, buckets):
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', str(bound))])} {bucket_count}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """Phục vụ /metrics ở một luồng nền (dùng cho các chế độ chạy lâu như --daemon)."""
+    # Import ở đây để các lần chạy ngắn (cron, --check-updates) không phải nạp http.server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    print(f"Serving Prometheus metrics on :{port}/metrics")
+    return server
+
+
+describe("goldbot_stage_duration_seconds", "Latency of each pipeline stage per source.")
+describe("goldbot_http_requests_total", "Outbound HTTP requests by host and status code.")
+describe("goldbot_http_response_bytes_total", "Bytes received on the wire by host.")
+describe("goldbot_exchange_rate_cache_total", "Exchange-rate cache lookups by result (hit, stale, miss).")
+describe("goldbot_page_cache_total", "Scraped page lookups by result (not_modified, unchanged, parsed).")
+describe("goldbot_exchange_rate_source_total", "Exchange-rate source calls by source and result.")
+describe("goldbot_stream_fetch_total", "Streamed page downloads by result (truncated, full, fallback).")
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from models.price_quote import format_amount
+from services import history_store, sources
+from services.scheduler import VN_TZ
+
+DEFAULT_RESOLUTION = "day"
+DEFAULT_BARS = {"hour": 24, "day": 7}
+MAX_BARS = 60
+
+USAGE = (
+    "Usage: /ohlc <source> <gold type> [hour|day] [bars] [buy|sell]\n"
+    "  e.g. /ohlc domestic SJC, /ohlc domestic SJC hour 12, /ohlc international XAU day 30"
+)
+
+_TIME_FORMATS = {"hour": "%d/%m %H:%M", "day": "%d/%m/%Y"}
+
+
+def match_gold_type(source, name, path=None):
+    """Tên loại vàng đã lưu khớp với `name` (không phân biệt hoa thường), None nếu không có."""
+    name = name.lower()
+    for gold_type in history_store.rollup_gold_types(source, path=path):
+        if gold_type.lower() == name:
+            return gold_type
+    return None
+
+
+def format_bars(bars, resolution):
+    """Các nến OHLC dạng text thường (giá nghìn VND theo đơn vị niêm yết của nguồn)."""
+    lines = []
+    for bar in bars:
+        start = datetime.fromtimestamp(bar.start, VN_TZ).strftime(_TIME_FORMATS[resolution])
+        lines.append(
+            f"{start}  O {format_amount(bar.open)}  H {format_amount(bar.high)}"
+            f"  L {format_amount(bar.low)}  C {format_amount(bar.close)}"
+        )
+    return "\n".join(lines)
+
+
+def handle_command(text, available_types, path=None):
+    """
+    Xử lý /ohlc <source> <gold type> [hour|day] [bars] [buy|sell]: đọc thẳng rollup OHLC
+    trong history store. Trả về câu trả lời, hoặc None nếu không phải lệnh /ohlc.
+    """
+    parts = text.strip().split()
+    if not parts or parts[0].split("@", 1)[0].lower() != "/ohlc":
+        return None
+
+    args = parts[1:]
+    if not args or args[0].lower() not in available_types:
+        return f"Sources: {', '.join(available_types)}\n\n" + USAGE
+    source = args.pop(0).lower()
+
+    # Các tuỳ chọn ở cuối; phần còn lại là tên loại vàng (có thể có dấu cách)
+    resolution, bars, side = DEFAULT_RESOLUTION, None, "buy"
+    gold_type = match_gold_type(source, " ".join(args), path=path) if args else None
+    while args and gold_type is None:
+        last = args[-1].lower()
+        if last in history_store.RESOLUTIONS:
+            resolution = last
+        elif last in history_store.SIDES:
+            side = last
+        elif last.isdigit() and int(last) > 0:
+            bars = min(int(last), MAX_BARS)
+        else:
+            break
+        args.pop()
+
+    if gold_type is None and args:
+        gold_type = match_gold_type(source, " ".join(args), path=path)
+    if gold_type is None:
+        known = history_store.rollup_gold_types(source, path=path)
+        if not known:
+            return f"No price history for {source} yet."
+        return f"Gold types for {source}: {', '.join(known)}\n\n" + USAGE
+
+    bars = bars or DEFAULT_BARS[resolution]
+    rows = history_store.query_ohlc(source, gold_type, resolution, side, limit=bars, path=path)
+    if not rows:
+        return f"No {resolution} bars for {gold_type} yet."
+    unit = sources.get(source).price_unit
+    header = f"{gold_type} ({source}, {side}, per {resolution}, thousand VND/{unit})"
+    return header + "\n" + format_bars(rows, resolution)
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from config import STATE_DIR, STREAMING_FETCH
+from models.price_quote import PriceQuote
+from services import http_client, metrics
+from utils.html_stream import ElementStreamWatcher
+
+PAGE_CACHE_PATH = os.path.join(STATE_DIR, "page_cache.json")
+# Tăng khi định dạng kết quả parse thay đổi, để bỏ cache cũ
+PAGE_CACHE_VERSION = 2
+
+_entries = None  # url -> {"etag", "last_modified", "digest", "result", "updated_at"}
+_lock = threading.Lock()
+
+
+def _encode(value):
+    if isinstance(value, PriceQuote):
+        return {"__quote__": value.to_dict()}
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _decode(data):
+    if "__quote__" in data:
+        return PriceQuote.from_dict(data["__quote__"])
+    return data
+
+
+def _load():
+    global _entries
+    if _entries is not None:
+        return
+    try:
+        with open(PAGE_CACHE_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f, object_hook=_decode)
+        if isinstance(data, dict) and data.get("version") == PAGE_CACHE_VERSION:
+            _entries = data.get("entries") or {}
+        else:
+            _entries = {}
+    except FileNotFoundError:
+        _entries = {}
+    except Exception as e:
+        print(f"Failed to load page cache: {e}")
+        _entries = {}
+
+
+def _save():
+    try:
+        os.makedirs(os.path.dirname(PAGE_CACHE_PATH), exist_ok=True)
+        tmp_path = f"{PAGE_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": PAGE_CACHE_VERSION, "entries": _entries},
+                f,
+                ensure_ascii=False,
+                default=_encode,
+            )
+        os.replace(tmp_path, PAGE_CACHE_PATH)
+    except Exception as e:
+        print(f"Failed to save page cache: {e}")
+
+
+def region_digest(content, markers):
+    """
+    Băm vùng HTML chứa bảng giá, không cần parse cả trang.
+
+    markers = (start, end1, end2, ...): vùng bắt đầu tại `start` và kết thúc sau
+    lần lượt các marker kết thúc. Trả về None nếu không tìm thấy vùng.
+    """
+    start_marker, *end_markers = markers
+    start = content.find(start_marker)
+    if start < 0:
+        return None
+
+    end = start + len(start_marker)
+    for marker in end_markers:
+        pos = content.find(marker, end)
+        if pos < 0:
+            return None
+        end = pos + len(marker)
+
+    return hashlib.sha256(content[start:end]).hexdigest()
+
+
+def _get_entry(url):
+    with _lock:
+        _load()
+        entry = _entries.get(url)
+        return dict(entry) if entry else None
+
+
+def _store_entry(url, entry):
+    with _lock:
+        _load()
+        _entries[url] = entry
+        _save()
+
+
+def _as_result(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _download(url, headers, stream_target, source):
+    """
+    Tải trang; trả về (response, content, truncated). Với `stream_target` = (tag, class)
+    thì tải dạng stream và ngừng ngay khi phần tử đó đã đóng (truncated=True).
+    """
+    with metrics.timed("fetch", source) as fields:
+        if stream_target and STREAMING_FETCH:
+            watcher = ElementStreamWatcher(*stream_target)
+            response, content, truncated = http_client.get_until(url, watcher.feed, headers=headers)
+        else:
+            response = http_client.get(url, headers=headers)
+            content, truncated = response.content, False
+        fields["status"] = response.status_code
+        fields["truncated"] = truncated
+    return response, content, truncated
+
+
+def fetch_parsed(url, parse, region, is_valid, headers=None, source=None, stream_target=None):
+    """
+    GET có điều kiện (ETag/Last-Modified) rồi parse trang.
+
+    Bỏ qua việc parse và trả về kết quả đã lưu khi server trả 304, hoặc khi
+    vùng bảng giá (xem `region_digest`) không đổi so với lần trước.
+    Chỉ kết quả thỏa `is_valid` mới được lưu lại. Lỗi HTTP được raise như requests.
+    `source` chỉ dùng để gắn nhãn metrics.
+
+    `stream_target` = (tag, class) của phần tử chứa bảng giá: trang được tải dạng
+    stream và ngừng khi phần tử đó đóng. Nếu phần đã tải không parse ra kết quả
+    hợp lệ thì tải lại cả trang.
+    """
+    entry = _get_entry(url)
+    cached_result = entry.get("result") if entry else None
+
+    request_headers = dict(headers or {})
+    if cached_result is not None:
+        if entry.get("etag"):
+            request_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            request_headers["If-Modified-Since"] = entry["last_modified"]
+
+    response, content, truncated = _download(url, request_headers, stream_target, source)
+
+    if response.status_code == 304 and cached_result is not None:
+        print(f"{url} not modified; reusing parsed data.")
+        metrics.inc("goldbot_page_cache_total", source=source, result="not_modified")
+        return _as_result(cached_result)
+
+    response.raise_for_status()
+    if stream_target:
+        metrics.inc("goldbot_stream_fetch_total", source=source, result="truncated" if truncated else "full")
+    digest = region_digest(content, region)
+
+    if cached_result is not None and digest and digest == entry.get("digest"):
+        print(f"{url} price region unchanged; reusing parsed data.")
+        metrics.inc("goldbot_page_cache_total", source=source, result="unchanged")
+        entry.update(
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            updated_at=time.time(),
+        )
+        _store_entry(url, entry)
+        return _as_result(cached_result)
+
+    with metrics.timed("parse", source):
+        result = parse(content)
+    if truncated and not is_valid(result):
+        print(f"{url} truncated download did not parse; downloading the full page.")
+        metrics.inc("goldbot_stream_fetch_total", source=source, result="fallback")
+        response, content, _ = _download(url, headers, None, source)
+        response.raise_for_status()
+        digest = region_digest(content, region)
+        with metrics.timed("parse", source):
+            result = parse(content)
+    metrics.inc("goldbot_page_cache_total", source=source, result="parsed")
+    if is_valid(result):
+        _store_entry(url, {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "digest": digest,
+            "result": result,
+            "updated_at": time.time(),
+        })
+    return result
+
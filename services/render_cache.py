@@ -0,0 +1,74 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from services import metrics
+
+# Biến thể render: tên -> (markup, narrow). markup quyết định cách escape và bọc tin nhắn.
+VARIANTS = {
+    "markdown": ("markdown", False),
+    "narrow": ("markdown", True),  # cột "Loại" hẹp hơn cho màn hình điện thoại
+    "html": ("html", False),
+    "plain": ("plain", False),
+}
+DEFAULT_VARIANT = "markdown"
+
+# parse_mode của Telegram cho từng markup
+PARSE_MODES = {"markdown": "MarkdownV2", "html": "HTML", "plain": None}
+
+
+def markup_of(variant):
+    return VARIANTS[variant][0]
+
+
+def snapshot_digest(source_name, quotes, trend, extra=()):
+    """Digest của dữ liệu dùng để render (không gồm thời điểm fetch): giống nhau thì section giống nhau."""
+    key = (
+        source_name,
+        tuple((q.gold_type, q.buy, q.sell, q.buy_change, q.sell_change) for q in quotes),
+        trend,
+        tuple(extra),
+    )
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """
+    Cache LRU các section đã render, khoá theo (digest snapshot, biến thể).
+    Giá không đổi thì mọi lần trả lời / broadcast chỉ là một lần tra dict,
+    kể cả phần escape MarkdownV2 của section quốc tế.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def render(self, source, quotes, trend, extra=(), variant=DEFAULT_VARIANT):
+        markup, narrow = VARIANTS[variant]
+        key = (snapshot_digest(source.name, quotes, trend, extra), variant)
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+        if text is not None:
+            metrics.inc("goldbot_render_cache_total", result="hit")
+            return text
+
+        metrics.inc("goldbot_render_cache_total", result="miss")
+        with metrics.timed("format", source.name, variant=variant):
+            text = source.render(quotes, trend, extra, markup=markup, narrow=narrow)
+        with self._lock:
+            self._entries[key] = text
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return text
+
+    def section(self, source, snapshot, variant=DEFAULT_VARIANT):
+        """Section của một SourceSnapshot ở biến thể `variant`."""
+        if variant == DEFAULT_VARIANT:
+            return snapshot.text
+        return self.render(source, snapshot.quotes, snapshot.trend, snapshot.extra, variant)
+
+
+metrics.describe("goldbot_render_cache_total", "Rendered section lookups by result (hit, miss).")
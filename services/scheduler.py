@@ -0,0 +1,115 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from config import (
+    REFRESH_BACKOFF_AFTER,
+    REFRESH_INTERVALS,
+    REFRESH_MAX_INTERVAL,
+    REFRESH_OFF_HOURS_FACTOR,
+    VN_RETAIL_HOURS,
+)
+from services import metrics
+from services.snapshot_diff import normalize
+
+VN_TZ = timezone(timedelta(hours=7))
+
+try:
+    from zoneinfo import ZoneInfo
+
+    NEW_YORK_TZ = ZoneInfo("America/New_York")
+except Exception:
+    # Thiếu tzdata: dùng giờ chuẩn miền Đông (lệch tối đa 1 giờ khi có DST)
+    NEW_YORK_TZ = timezone(timedelta(hours=-5))
+
+
+def is_vn_retail_hours(now):
+    start, end = VN_RETAIL_HOURS
+    return start <= now.astimezone(VN_TZ).hour < end
+
+
+def is_comex_session(now):
+    """COMEX (CME Globex) giao dịch vàng từ 18:00 Chủ nhật tới 17:00 thứ Sáu giờ New York, nghỉ 17:00-18:00 mỗi ngày."""
+    ny = now.astimezone(NEW_YORK_TZ)
+    weekday = ny.weekday()
+    if weekday == 5:
+        return False
+    if weekday == 6:
+        return ny.hour >= 18
+    if weekday == 4:
+        return ny.hour < 17
+    return ny.hour != 17
+
+
+class AdaptiveScheduler:
+    """
+    Làm mới từng nguồn (GoldSource trong services.sources) theo chu kỳ riêng:
+    - chu kỳ cơ bản REFRESH_INTERVALS[name] hoặc source.refresh_interval,
+      không ngắn hơn mức budget của nguồn cho phép (source.min_interval),
+    - chậm hơn REFRESH_OFF_HOURS_FACTOR lần ngoài giờ giao dịch của nguồn,
+    - giãn gấp đôi mỗi lần giá không đổi sau REFRESH_BACKOFF_AFTER lần liên tiếp,
+      tối đa REFRESH_MAX_INTERVAL; có thay đổi thì quay về chu kỳ cơ bản.
+
+    `refresh(types)` nhận tên các nguồn đến hạn và trả về dict type -> SourceSnapshot.
+    """
+
+    def __init__(self, sources, refresh, intervals=None):
+        self.sources = {s.name: s for s in sources}
+        self.refresh = refresh
+        self.intervals = dict(REFRESH_INTERVALS if intervals is None else intervals)
+        self._state = {name: {"due": 0.0, "unchanged": 0, "last": None} for name in self.sources}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="refresh-scheduler")
+
+    def interval(self, name, now=None):
+        now = now or datetime.now(timezone.utc)
+        source = self.sources[name]
+        base = seconds = max(self.intervals.get(name, source.refresh_interval), source.min_interval)
+        if source.market_hours is not None and not source.market_hours(now):
+            seconds *= REFRESH_OFF_HOURS_FACTOR
+        steps = self._state[name]["unchanged"] - REFRESH_BACKOFF_AFTER + 1
+        if steps > 0:
+            seconds *= 2 ** min(steps, 10)
+        return min(seconds, max(REFRESH_MAX_INTERVAL, base))
+
+    def run_once(self):
+        """Làm mới các nguồn đã đến hạn; trả về số giây tới lần đến hạn kế tiếp."""
+        due = [name for name in self.sources if self._state[name]["due"] <= time.monotonic()]
+        if due:
+            try:
+                snapshots = self.refresh(due) or {}
+            except Exception as e:
+                print(f"Scheduled refresh failed: {e}")
+                snapshots = {}
+
+            finished = time.monotonic()
+            for source in due:
+                state = self._state[source]
+                snapshot = snapshots.get(source)
+                if snapshot is not None:
+                    current = normalize({source: snapshot})[source]
+                    state["unchanged"] = state["unchanged"] + 1 if current == state["last"] else 0
+                    state["last"] = current
+                interval = self.interval(source)
+                state["due"] = finished + interval
+                metrics.log_event(
+                    "schedule",
+                    source=source,
+                    fetched=snapshot is not None,
+                    unchanged=state["unchanged"],
+                    next_in_s=round(interval),
+                )
+        return max(0.0, min(s["due"] for s in self._state.values()) - time.monotonic())
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._stop.wait(max(1.0, self.run_once()))
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self):
+        self._thread.join()
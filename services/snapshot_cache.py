@@ -0,0 +1,60 @@
+import threading
+import time
+
+
+class SnapshotCache:
+    """
+    Cache TTL ngắn cho kết quả dựng section theo từng nguồn (domestic, btmc, ...).
+
+    Nếu nhiều luồng cùng cần một nguồn chưa có trong cache, chỉ một luồng gọi
+    `build`; các luồng còn lại chờ và dùng chung kết quả (single-flight).
+    Kết quả None (fetch lỗi) không được cache. `ttl` của từng lần gọi
+    get_or_build (nếu có) thay cho ttl mặc định, để mỗi nguồn có thời gian cache riêng.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values = {}  # key -> (value, expires_at)
+        self._inflight = {}  # key -> threading.Event
+
+    def get(self, key):
+        with self._lock:
+            cached = self._values.get(key)
+        if cached and time.monotonic() < cached[1]:
+            return cached[0]
+        return None
+
+    def get_or_build(self, key, build, ttl=None):
+        with self._lock:
+            cached = self._values.get(key)
+            if cached and time.monotonic() < cached[1]:
+                return cached[0]
+
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            # Dùng chung kết quả của luồng đang build (None nếu luồng đó thất bại)
+            event.wait()
+            return self.get(key)
+
+        value = None
+        try:
+            value = build()
+        finally:
+            with self._lock:
+                if value is not None:
+                    self._values[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+                self._inflight.pop(key, None)
+            event.set()
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._values.clear()
+            else:
+                self._values.pop(key, None)
@@ -0,0 +1,103 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from config import STATE_DIR
+
+LAST_SNAPSHOT_PATH = os.path.join(STATE_DIR, "last_snapshot.json")
+
+
+@dataclass(frozen=True)
+class QuoteDelta:
+    """Thay đổi của một loại vàng giữa hai snapshot (giá VND)."""
+
+    source: str
+    gold_type: str
+    kind: str  # 'changed', 'added' hoặc 'removed'
+    old_buy: Optional[int] = None
+    new_buy: Optional[int] = None
+    old_sell: Optional[int] = None
+    new_sell: Optional[int] = None
+
+    @property
+    def buy_delta(self):
+        if self.old_buy is None or self.new_buy is None:
+            return None
+        return self.new_buy - self.old_buy
+
+    @property
+    def sell_delta(self):
+        if self.old_sell is None or self.new_sell is None:
+            return None
+        return self.new_sell - self.old_sell
+
+
+def normalize(snapshots):
+    """
+    dict type -> SourceSnapshot  =>  {source: {gold_type: {"buy": int, "sell": int}}}.
+    Chỉ giữ giá số, không giữ text đã render hay thời điểm fetch.
+    Loại vàng trùng tên trong cùng nguồn được đánh số '#2', '#3', ...
+    """
+    normalized = {}
+    for source, snapshot in snapshots.items():
+        rows = {}
+        for quote in snapshot.quotes:
+            key = quote.gold_type
+            n = 2
+            while key in rows:
+                key = f"{quote.gold_type}#{n}"
+                n += 1
+            rows[key] = {"buy": quote.buy, "sell": quote.sell}
+        normalized[source] = rows
+    return normalized
+
+
+def diff_snapshots(old, new):
+    """
+    So sánh hai snapshot đã normalize, trả về danh sách QuoteDelta (mỗi loại vàng một mục).
+    Nguồn không có trong `new` (fetch lỗi) không được coi là thay đổi.
+    """
+    deltas = []
+    for source, new_rows in new.items():
+        old_rows = old.get(source, {})
+        for gold_type, prices in new_rows.items():
+            previous = old_rows.get(gold_type)
+            if previous is None:
+                deltas.append(QuoteDelta(source, gold_type, "added", new_buy=prices["buy"], new_sell=prices["sell"]))
+            elif previous != prices:
+                deltas.append(QuoteDelta(
+                    source, gold_type, "changed",
+                    old_buy=previous.get("buy"), new_buy=prices["buy"],
+                    old_sell=previous.get("sell"), new_sell=prices["sell"],
+                ))
+        for gold_type, prices in old_rows.items():
+            if gold_type not in new_rows:
+                deltas.append(QuoteDelta(source, gold_type, "removed", old_buy=prices.get("buy"), old_sell=prices.get("sell")))
+    return deltas
+
+
+def load_last_snapshot(path=LAST_SNAPSHOT_PATH):
+    """Snapshot đã normalize của lần gửi trước, hoặc None nếu chưa có."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else None
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Failed to load last snapshot: {e}")
+        return None
+
+
+def save_last_snapshot(normalized, path=LAST_SNAPSHOT_PATH):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(normalized, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"Failed to save last snapshot: {e}")
+        return False
@@ -0,0 +1,175 @@
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from config import FETCH_DEADLINE, SERVER_REFRESH_INTERVAL, SNAPSHOT_TTL, TIMEOUT
+from services.scheduler import is_comex_session, is_vn_retail_hours
+
+# services.fetcher (requests, bs4, converter) và services.formatter chỉ được import bên trong
+# các hàm fetch/render dưới đây, để các lần chạy không cần fetch (vd. --check-updates
+# không có update) khởi động nhanh.
+
+
+# Đơn vị niêm yết giá -> số đơn vị trong một lượng (1 lượng = 10 chỉ)
+UNITS_PER_TAEL = {"tael": 1, "chỉ": 10}
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    """Kết quả fetch + parse của một nguồn: các dòng giá, xu hướng và dữ liệu riêng cho render."""
+
+    quotes: tuple
+    trend: Optional[str] = None
+    extra: tuple = ()
+
+
+@dataclass(frozen=True)
+class GoldSource:
+    """
+    Một nguồn giá vàng.
+
+    - fetch(): tải và parse trang, trả về FetchResult (None nếu lỗi)
+    - render(quotes, trend, extra, markup, narrow): dựng section tin nhắn;
+      markup là 'markdown', 'html' hoặc 'plain', narrow=True cho màn hình hẹp
+    - ttl: thời gian dùng lại snapshot (giây)
+    - timeout: thời gian tối đa chờ nguồn khi fetch song song (giây)
+    - priority: thứ tự trong tin nhắn và danh sách type (nhỏ đứng trước)
+    - refresh_interval: chu kỳ làm mới cơ bản của scheduler (giây)
+    - budget: số lần làm mới tối đa mỗi giờ; nguồn tốn kém khai báo budget thấp
+    - market_hours(now): True nếu đang trong giờ giao dịch; None = luôn giao dịch
+    - price_unit: đơn vị niêm yết giá ('tael' hoặc 'chỉ', xem UNITS_PER_TAEL)
+    """
+
+    name: str
+    fetch: Callable[[], Optional[FetchResult]]
+    render: Callable[..., str]
+    ttl: int = SNAPSHOT_TTL
+    timeout: float = FETCH_DEADLINE
+    priority: int = 100
+    refresh_interval: int = SERVER_REFRESH_INTERVAL
+    budget: Optional[int] = None
+    market_hours: Optional[Callable] = None
+    price_unit: str = "tael"
+
+    @property
+    def min_interval(self):
+        return 3600 / self.budget if self.budget else 0
+
+    @property
+    def units_per_tael(self):
+        return UNITS_PER_TAEL[self.price_unit]
+
+
+_registry = {}
+
+
+def register(source):
+    _registry[source.name] = source
+    return source
+
+
+def get(name):
+    return _registry[name]
+
+
+def all_sources():
+    return sorted(_registry.values(), key=lambda s: (s.priority, s.name))
+
+
+def names():
+    return [s.name for s in all_sources()]
+
+
+def _fetch_domestic():
+    from services.fetcher import fetch_domestic_gold_prices
+
+    buy_trend, data = fetch_domestic_gold_prices()
+    if not data:
+        print(buy_trend)
+        return None
+    return FetchResult(quotes=tuple(data), trend=buy_trend)
+
+
+def _fetch_international():
+    from services.fetcher import fetch_international_gold_prices, make_international_quote
+
+    current_price_in_usd, change, current_price_in_vnd, exchange_rate_to_vnd = fetch_international_gold_prices()
+    if not change:
+        print(current_price_in_usd)
+        return None
+    quote = make_international_quote(current_price_in_usd, change, current_price_in_vnd, exchange_rate_to_vnd)
+    if change.startswith('+'):
+        trend = "increase"
+    elif change.startswith('-'):
+        trend = "decrease"
+    else:
+        trend = "still"
+    return FetchResult(
+        quotes=(quote,) if quote else (),
+        trend=trend,
+        extra=(current_price_in_usd, change, current_price_in_vnd, exchange_rate_to_vnd),
+    )
+
+
+def _fetch_btmc():
+    from services.fetcher import fetch_btmc_gold_prices
+
+    data, status, err = fetch_btmc_gold_prices()
+    if err:
+        print(err)
+        return None
+    return FetchResult(quotes=tuple(data), trend=status or None)
+
+
+def _render_domestic(quotes, trend, extra, markup="markdown", narrow=False):
+    from services.formatter import DOMESTIC_NARROW_WIDTHS, format_domestic_data
+
+    if narrow:
+        return format_domestic_data(list(quotes), trend, col_widths=DOMESTIC_NARROW_WIDTHS)
+    return format_domestic_data(list(quotes), trend)
+
+
+def _render_international(quotes, trend, extra, markup="markdown", narrow=False):
+    from services.formatter import format_international_data
+
+    return format_international_data(*extra, markup=markup)
+
+
+def _render_btmc(quotes, trend, extra, markup="markdown", narrow=False):
+    from services.formatter import BTMC_NARROW_WIDTHS, format_btmc_data
+
+    if narrow:
+        return format_btmc_data(list(quotes), trend or "", col_widths=BTMC_NARROW_WIDTHS)
+    return format_btmc_data(list(quotes), trend or "")
+
+
+register(GoldSource(
+    name="domestic",
+    fetch=_fetch_domestic,
+    render=_render_domestic,
+    timeout=FETCH_DEADLINE,
+    priority=10,
+    budget=60,  # trang ~300KB
+    market_hours=is_vn_retail_hours,
+))
+
+register(GoldSource(
+    name="international",
+    fetch=_fetch_international,
+    render=_render_international,
+    # Gồm cả tra tỷ giá (có thể chờ nguồn dự phòng)
+    timeout=FETCH_DEADLINE,
+    priority=20,
+    budget=120,
+    market_hours=is_comex_session,
+))
+
+register(GoldSource(
+    name="btmc",
+    fetch=_fetch_btmc,
+    render=_render_btmc,
+    timeout=TIMEOUT * 2,
+    priority=30,
+    budget=60,
+    market_hours=is_vn_retail_hours,
+    price_unit="chỉ",  # btmc.vn niêm yết giá theo chỉ
+))
@@ -0,0 +1,294 @@
+import contextlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+
+from config import STATE_DIR
+from models.price_quote import format_amount
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ khoá giữa các luồng trong process
+    fcntl = None
+
+SUBSCRIPTIONS_PATH = os.path.join(STATE_DIR, "subscriptions.json")
+
+WILDCARD = "*"
+
+USAGE = (
+    "Usage:\n"
+    "/subscribe <source> [gold type|*] <threshold>\n"
+    "  threshold: 500k, 1tr, 2000000 (VND) or 0.5%\n"
+    "  e.g. /subscribe domestic SJC 500k, /subscribe btmc * 1%\n"
+    "/unsubscribe <id|all>\n"
+    "/subscriptions"
+)
+
+_AMOUNT_SUFFIXES = {"k": 1_000, "tr": 1_000_000, "m": 1_000_000}
+
+
+@dataclass
+class Subscription:
+    """Một đăng ký cảnh báo giá của một chat; `baseline` là giá lúc báo gần nhất theo từng loại vàng."""
+
+    id: int
+    chat_id: str
+    source: str
+    gold_type: str  # tên loại vàng hoặc '*' cho mọi loại của nguồn
+    threshold: float
+    mode: str  # 'abs' (VND) hoặc 'pct'
+    side: str = "buy"  # so sánh giá mua ('buy') hay giá bán ('sell')
+    baseline: dict = field(default_factory=dict)
+
+    def describe(self):
+        if self.mode == "pct":
+            threshold = f"{self.threshold:g}%"
+        else:
+            threshold = f"{int(self.threshold):,} VND"
+        return f"#{self.id} {self.source} {self.gold_type} ±{threshold}"
+
+    def crossed(self, old, new):
+        if old is None or new is None:
+            return False
+        moved = abs(new - old)
+        if self.mode == "pct":
+            return old > 0 and moved * 100 / old >= self.threshold
+        return moved >= self.threshold
+
+
+@dataclass(frozen=True)
+class Alert:
+    chat_id: str
+    subscription: Subscription
+    gold_type: str
+    old: int
+    new: int
+
+
+def parse_threshold(text):
+    """'500k' -> (500000, 'abs'), '1.5%' -> (1.5, 'pct'); None nếu không hợp lệ."""
+    text = text.strip().lower().replace(",", "")
+    try:
+        if text.endswith("%"):
+            value, mode = float(text[:-1]), "pct"
+        else:
+            multiplier = 1
+            for suffix, unit in _AMOUNT_SUFFIXES.items():
+                if text.endswith(suffix):
+                    text, multiplier = text[: -len(suffix)], unit
+                    break
+            value, mode = float(text) * multiplier, "abs"
+    except ValueError:
+        return None
+    return (value, mode) if value > 0 else None
+
+
+class SubscriptionRegistry:
+    """
+    Danh sách đăng ký lưu trong .state/subscriptions.json, kèm chỉ mục
+    (source, gold_type) -> [Subscription] để mỗi snapshot chỉ cần duyệt các dòng giá một lần.
+
+    Nhiều process (--check-updates, --schedule, --serve) dùng chung file: mọi thao tác chạy
+    dưới khoá file và nạp lại file nếu process khác đã ghi, nên không ghi đè đăng ký của nhau.
+    """
+
+    def __init__(self, path=SUBSCRIPTIONS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._next_id = 1
+        self._index = {}
+        self._stamp = None  # (inode, size, mtime) của file lúc nạp/ghi gần nhất
+        self._load()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Khoá giữa các luồng và giữa các process, rồi nạp lại file nếu nó đã đổi."""
+        with self._lock:
+            if fcntl is None:
+                self._reload()
+                yield
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._reload()
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reload(self):
+        if self._file_stamp() != self._stamp:
+            self._load()
+
+    def _load(self):
+        self._subscriptions = {}
+        self._next_id = 1
+        self._stamp = self._file_stamp()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for item in data.get("subscriptions", []):
+                sub = Subscription(**item)
+                self._subscriptions[sub.id] = sub
+            self._next_id = max([data.get("next_id", 1)] + [s.id + 1 for s in self._subscriptions.values()])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Failed to load subscriptions: {e}")
+        self._reindex()
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            data = {
+                "next_id": self._next_id,
+                "subscriptions": [asdict(s) for s in self._subscriptions.values()],
+            }
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            self._stamp = self._file_stamp()
+        except Exception as e:
+            print(f"Failed to save subscriptions: {e}")
+
+    def _reindex(self):
+        index = {}
+        for sub in self._subscriptions.values():
+            index.setdefault((sub.source, sub.gold_type.lower()), []).append(sub)
+        self._index = index
+
+    def add(self, chat_id, source, gold_type, threshold, mode):
+        with self._locked():
+            sub = Subscription(
+                id=self._next_id,
+                chat_id=str(chat_id),
+                source=source,
+                gold_type=gold_type or WILDCARD,
+                threshold=threshold,
+                mode=mode,
+            )
+            self._next_id += 1
+            self._subscriptions[sub.id] = sub
+            self._reindex()
+            self._save()
+            return sub
+
+    def remove(self, chat_id, sub_id=None):
+        """Xoá một đăng ký của chat (hoặc tất cả nếu sub_id là None); trả về số đăng ký đã xoá."""
+        chat_id = str(chat_id)
+        with self._locked():
+            ids = [
+                s.id for s in self._subscriptions.values()
+                if s.chat_id == chat_id and (sub_id is None or s.id == sub_id)
+            ]
+            for i in ids:
+                del self._subscriptions[i]
+            if ids:
+                self._reindex()
+                self._save()
+            return len(ids)
+
+    def for_chat(self, chat_id):
+        chat_id = str(chat_id)
+        with self._locked():
+            return [s for s in self._subscriptions.values() if s.chat_id == chat_id]
+
+    def evaluate(self, snapshots):
+        """
+        So từng dòng giá trong snapshot mới với baseline của các đăng ký khớp (kể cả '*').
+        Trả về danh sách Alert cho các ngưỡng bị vượt; baseline được dời tới giá mới khi báo.
+        Lần đầu thấy một loại vàng chỉ ghi baseline, không báo.
+        """
+        alerts = []
+        changed = False
+        with self._locked():
+            if not self._index:
+                return alerts
+            for source, snapshot in snapshots.items():
+                for quote in snapshot.quotes:
+                    matches = self._index.get((source, quote.gold_type.lower()), []) + self._index.get((source, WILDCARD), [])
+                    for sub in matches:
+                        new = getattr(quote, sub.side)
+                        if new is None:
+                            continue
+                        old = sub.baseline.get(quote.gold_type)
+                        if old is None:
+                            sub.baseline[quote.gold_type] = new
+                            changed = True
+                        elif sub.crossed(old, new):
+                            alerts.append(Alert(sub.chat_id, sub, quote.gold_type, old, new))
+                            sub.baseline[quote.gold_type] = new
+                            changed = True
+            if changed:
+                self._save()
+        return alerts
+
+
+def format_alerts(alerts):
+    """Gom các Alert theo chat: dict chat_id -> nội dung tin nhắn (text thường)."""
+    messages = {}
+    for alert in alerts:
+        diff = alert.new - alert.old
+        arrow = "▲" if diff > 0 else "▼"
+        pct = diff * 100 / alert.old if alert.old else 0
+        line = (
+            f"{alert.subscription.source} {alert.gold_type}: "
+            f"{format_amount(alert.old)} → {format_amount(alert.new)} "
+            f"({arrow}{format_amount(abs(diff))}, {pct:+.2f}%) [#{alert.subscription.id}]"
+        )
+        messages.setdefault(alert.chat_id, ["Price alert:"]).append(line)
+    return {chat_id: "\n".join(lines) for chat_id, lines in messages.items()}
+
+
+def handle_command(registry, chat_id, text, available_types):
+    """
+    Xử lý /subscribe, /unsubscribe, /subscriptions. Trả về câu trả lời (text thường),
+    hoặc None nếu tin nhắn không phải lệnh đăng ký.
+    """
+    parts = text.strip().split()
+    if not parts:
+        return None
+    command = parts[0].split("@", 1)[0].lower()
+    args = parts[1:]
+
+    if command == "/subscriptions":
+        subs = registry.for_chat(chat_id)
+        if not subs:
+            return "No subscriptions.\n\n" + USAGE
+        return "Subscriptions:\n" + "\n".join(s.describe() for s in subs)
+
+    if command == "/unsubscribe":
+        if not args:
+            return USAGE
+        if args[0].lower() == "all":
+            removed = registry.remove(chat_id)
+        else:
+            try:
+                removed = registry.remove(chat_id, int(args[0].lstrip("#")))
+            except ValueError:
+                return USAGE
+        return f"Removed {removed} subscription(s)."
+
+    if command == "/subscribe":
+        if len(args) < 2 or args[0].lower() not in available_types:
+            return f"Sources: {', '.join(available_types)}\n\n" + USAGE
+        parsed = parse_threshold(args[-1])
+        if parsed is None:
+            return "Invalid threshold.\n\n" + USAGE
+        source = args[0].lower()
+        gold_type = " ".join(args[1:-1]) or WILDCARD
+        sub = registry.add(chat_id, source, gold_type, *parsed)
+        return f"Subscribed: {sub.describe()}"
+
+    return None
@@ -1,5 +1,22 @@
 import requests
-from config import BOT_TOKEN, TELEGRAM_URL, CHAT_ID, TIMEOUT
+from config import BOT_TOKEN, TELEGRAM_API_URL, TELEGRAM_URL, CHAT_ID, TIMEOUT
+from services import http_client, metrics
+
+def post_message(chat_id, message, parse_mode="MarkdownV2"):
+    """Gọi sendMessage và trả về response (không xử lý lỗi), dùng cho broadcast."""
+    with metrics.timed("send", "telegram") as fields:
+        response = http_client.post(
+            TELEGRAM_URL,
+            data={
+                'chat_id': chat_id,
+                'text': message,
+                'parse_mode': parse_mode
+            },
+            timeout=TIMEOUT
+        )
+        fields["status"] = response.status_code
+    return response
+
 
 def send_to_telegram(message, chat_id=None, parse_mode="MarkdownV2"):
     """
@@ -12,15 +29,7 @@ def send_to_telegram(message, chat_id=None, parse_mode="MarkdownV2"):
         return False
 
     try:
-        response = requests.post(
-            TELEGRAM_URL,
-            data={
-                'chat_id': effective_chat_id,
-                'text': message,
-                'parse_mode': parse_mode
-            },
-            timeout=TIMEOUT
-        )
+        response = post_message(effective_chat_id, message, parse_mode=parse_mode)
         if response.status_code != 200:
             print(f"Error sending message: {response.status_code}, {response.text}")
             return False
@@ -33,17 +42,22 @@ def send_to_telegram(message, chat_id=None, parse_mode="MarkdownV2"):
 
 
 def get_updates(offset=None, timeout=0, limit=100):
+    """
+    Lấy các update mới qua getUpdates.
+    timeout > 0 là long-poll: Telegram giữ kết nối tới khi có update hoặc hết timeout giây.
+    """
     if not BOT_TOKEN:
         print("BOT_TOKEN is missing; cannot fetch Telegram updates.")
         return []
 
-    base_url = f"https://api.telegram.org/bot{BOT_TOKEN}/getUpdates"
+    base_url = f"{TELEGRAM_API_URL}/getUpdates"
     params = {"timeout": timeout, "limit": limit}
     if offset is not None:
         params["offset"] = offset
 
     try:
-        response = requests.get(base_url, params=params, timeout=TIMEOUT)
+        # Thời gian chờ HTTP phải dài hơn thời gian long-poll
+        response = http_client.get(base_url, params=params, timeout=TIMEOUT + timeout)
         response.raise_for_status()
         payload = response.json()
         if not payload.get("ok"):
@@ -53,3 +67,26 @@ def get_updates(offset=None, timeout=0, limit=100):
     except requests.RequestException as e:
         print(f"Error fetching Telegram updates: {e}")
         return []
+
+
+def set_webhook(url, secret_token):
+    """Đăng ký webhook với Telegram. Khi webhook đang bật, getUpdates sẽ không dùng được."""
+    if not BOT_TOKEN:
+        print("BOT_TOKEN is missing; cannot set Telegram webhook.")
+        return False
+
+    try:
+        response = http_client.post(
+            f"{TELEGRAM_API_URL}/setWebhook",
+            data={"url": url, "secret_token": secret_token},
+            timeout=TIMEOUT,
+        )
+        payload = response.json()
+        if response.status_code != 200 or not payload.get("ok"):
+            print(f"Telegram setWebhook failed: {response.status_code}, {payload}")
+            return False
+        print("Telegram webhook registered.")
+        return True
+    except (requests.RequestException, ValueError) as e:
+        print(f"Error setting Telegram webhook: {e}")
+        return False
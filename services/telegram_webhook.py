@@ -0,0 +1,96 @@
+import collections
+import hmac
+import json
+import queue
+import threading
+
+from services import metrics
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+MAX_BODY_BYTES = 1024 * 1024  # update Telegram lớn hơn thế này là bất thường
+
+
+class WebhookReceiver:
+    """
+    Nhận update Telegram qua webhook.
+
+    `accept` kiểm tra secret token và đưa update vào hàng đợi rồi trả về ngay;
+    một luồng worker lấy update theo lô và gọi `process_updates(updates)`,
+    nên HTTP response không bao giờ phải chờ việc fetch giá.
+    """
+
+    def __init__(self, secret, process_updates, max_queue=1000, max_batch=100):
+        self.secret = secret
+        self.process_updates = process_updates
+        self.max_batch = max_batch
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._seen = collections.deque(maxlen=1000)  # Telegram gửi lại update khi không nhận được 200
+        self._seen_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="webhook-worker", daemon=True)
+
+    def authorized(self, headers):
+        """Secret token trong header có khớp không; gọi trước khi đọc body."""
+        token = headers.get(SECRET_HEADER) or ""
+        if hmac.compare_digest(token.encode("utf-8"), self.secret.encode("utf-8")):
+            return True
+        metrics.inc("goldbot_webhook_updates_total", result="unauthorized")
+        return False
+
+    def accept(self, headers, body):
+        """Trả về mã HTTP cho request webhook."""
+        if not self.authorized(headers):
+            return 401
+
+        try:
+            update = json.loads(body or b"{}")
+        except ValueError:
+            metrics.inc("goldbot_webhook_updates_total", result="invalid")
+            return 400
+        if not isinstance(update, dict):
+            return 400
+
+        update_id = update.get("update_id")
+        with self._seen_lock:
+            if update_id is not None and update_id in self._seen:
+                metrics.inc("goldbot_webhook_updates_total", result="duplicate")
+                return 200
+            self._seen.append(update_id)
+
+        try:
+            self._queue.put_nowait(update)
+        except queue.Full:
+            # Telegram sẽ gửi lại sau
+            with self._seen_lock:
+                self._seen.remove(update_id)
+            metrics.inc("goldbot_webhook_updates_total", result="queue_full")
+            return 503
+
+        metrics.inc("goldbot_webhook_updates_total", result="queued")
+        return 200
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=1)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self.process_updates(batch)
+            except Exception as e:
+                print(f"Failed to process webhook updates: {e}")
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+metrics.describe("goldbot_webhook_updates_total", "Telegram webhook requests by result.")
@@ -1,9 +1,164 @@
 import requests
 from bs4 import BeautifulSoup
+import json
+import os
 import re
-from typing import Optional, Union
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, Tuple, Union
 import time
 
+from config import (
+    EXCHANGE_RATE_BREAKER_COOLDOWN,
+    EXCHANGE_RATE_BREAKER_FAILURES,
+    EXCHANGE_RATE_HEDGE_DELAY,
+    EXCHANGE_RATE_STALE_TTL,
+    EXCHANGE_RATE_TTL,
+    STATE_DIR,
+)
+from services import http_client, metrics
+from utils.circuit_breaker import CircuitBreaker
+
+
+class _SharedRateCache:
+    """
+    Cache tỷ giá dùng chung cho cả tiến trình, lưu xuống file trong .state/
+    để các lần chạy sau (cron, --check-updates) dùng lại.
+
+    - Còn trong TTL: trả về ngay.
+    - Quá TTL nhưng trong stale TTL: trả về giá trị cũ và làm mới ở nền.
+    - Nhiều luồng cùng cần làm mới: chỉ một luồng thực sự gọi nguồn, các luồng khác chờ kết quả.
+    """
+
+    def __init__(self, path: str, ttl: int, stale_ttl: int):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        self._entry = None  # {"rate": float, "timestamp": float, "source": str}
+        self._inflight = None  # threading.Event của lần fetch đang chạy
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if isinstance(entry.get("rate"), (int, float)) and isinstance(entry.get("timestamp"), (int, float)):
+                if self._entry is None or entry["timestamp"] > self._entry["timestamp"]:
+                    self._entry = entry
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Failed to load exchange-rate cache: {e}")
+
+    def _save(self, entry: dict) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=True, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Failed to save exchange-rate cache: {e}")
+
+    def _age(self, entry: Optional[dict]) -> Optional[float]:
+        return time.time() - entry["timestamp"] if entry else None
+
+    def peek(self) -> Optional[dict]:
+        with self._lock:
+            return dict(self._entry) if self._entry else None
+
+    def store(self, rate: float, source: str) -> dict:
+        entry = {"rate": rate, "timestamp": time.time(), "source": source}
+        with self._lock:
+            self._entry = entry
+        self._save(entry)
+        return dict(entry)
+
+    def get(self, fetch: Callable[[], Optional[Tuple[float, str]]]) -> Optional[dict]:
+        with self._lock:
+            age = self._age(self._entry)
+            if age is None or age >= self.ttl:
+                # Có thể tiến trình khác vừa cập nhật file
+                self._load()
+                age = self._age(self._entry)
+            entry = dict(self._entry) if self._entry else None
+
+        if entry and age < self.ttl:
+            result = "hit"
+        elif entry and age < self.stale_ttl:
+            result = "stale"
+        else:
+            result = "miss"
+        metrics.inc("goldbot_exchange_rate_cache_total", result=result)
+        metrics.log_event("exchange_rate_cache", result=result, age_s=round(age, 1) if age is not None else None)
+
+        if result == "hit":
+            return entry
+        if result == "stale":
+            self._refresh_in_background(fetch)
+            return entry
+        return self._fetch_once(fetch)
+
+    def _refresh_in_background(self, fetch) -> None:
+        with self._lock:
+            if self._inflight is not None:
+                return
+        # Không dùng daemon thread: tiến trình chạy một lần vẫn kịp ghi tỷ giá mới ra file trước khi thoát
+        threading.Thread(target=self._fetch_once, args=(fetch,), name="exchange-rate-refresh").start()
+
+    def _fetch_once(self, fetch) -> Optional[dict]:
+        with self._lock:
+            event = self._inflight
+            leader = event is None
+            if leader:
+                event = self._inflight = threading.Event()
+
+        if not leader:
+            event.wait()
+            return self.peek()
+
+        result = None
+        try:
+            result = fetch()
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
+
+        if result:
+            rate, source = result
+            return self.store(rate, source)
+
+        entry = self.peek()
+        if entry:
+            print("Using cached rate due to fetch failure from all sources")
+        return entry
+
+
+_rate_cache = _SharedRateCache(
+    os.path.join(STATE_DIR, "exchange_rate.json"),
+    ttl=EXCHANGE_RATE_TTL,
+    stale_ttl=EXCHANGE_RATE_STALE_TTL,
+)
+
+
+# Circuit breaker theo nguồn, dùng chung cho mọi converter trong tiến trình;
+# trạng thái lưu trong .state/ để lần chạy sau không phải chờ timeout của nguồn đang lỗi
+_breakers = {
+    name: CircuitBreaker(
+        f"exchange-rate:{name}",
+        failure_threshold=EXCHANGE_RATE_BREAKER_FAILURES,
+        cooldown=EXCHANGE_RATE_BREAKER_COOLDOWN,
+        state_path=os.path.join(STATE_DIR, "circuit_breakers.json"),
+    )
+    for name in ("vietcombank", "investing")
+}
+
+
+def _is_plausible_rate(rate: Optional[float]) -> bool:
+    # Sanity check: USD/VND rate should be between 20,000 and 30,000
+    return rate is not None and 20000 <= rate <= 30000
+
 
 class USDVNDConverter:
     def __init__(self, timeout: int = 10):
@@ -24,7 +179,7 @@ class USDVNDConverter:
         }
         self._cached_rate = None
         self._cache_timestamp = None
-        self._cache_duration = 300  # Cache for 5 minutes
+        self._cache_duration = EXCHANGE_RATE_TTL
         self._last_source = None  # URL of the source that produced the current rate
 
     def _fetch_from_vietcombank(self) -> Optional[float]:
@@ -35,7 +190,7 @@ class USDVNDConverter:
             float: USD transfer rate if successful, None otherwise
         """
         try:
-            response = requests.get(
+            response = http_client.get(
                 self.vietcombank_url,
                 headers=self.headers,
                 timeout=self.timeout
@@ -48,8 +203,7 @@ class USDVNDConverter:
                     # Use the transfer (chuyển khoản) rate as the reference rate
                     rate_str = str(entry.get('transfer', '')).replace(',', '')
                     rate = float(rate_str)
-                    # Sanity check: USD/VND rate should be between 20,000 and 30,000
-                    if 20000 <= rate <= 30000:
+                    if _is_plausible_rate(rate):
                         return rate
                     break
             return None
@@ -65,7 +219,7 @@ class USDVNDConverter:
             str: HTML content if successful, None otherwise
         """
         try:
-            response = requests.get(
+            response = http_client.get(
                 self.url,
                 headers=self.headers,
                 timeout=self.timeout
@@ -122,8 +276,7 @@ class USDVNDConverter:
                 for match in matches:
                     try:
                         rate = float(match)
-                        # Sanity check: USD/VND rate should be between 20,000 and 30,000
-                        if 20000 <= rate <= 30000:
+                        if _is_plausible_rate(rate):
                             return rate
                     except ValueError:
                         continue
@@ -138,42 +291,104 @@ class USDVNDConverter:
         """
         Get the current USD to VND exchange rate
 
+        The rate is shared through the process-wide cache (persisted in .state/),
+        so every converter instance and every run reuses the same lookup.
+
         Args:
             use_cache (bool): Whether to use cached rate if available
 
         Returns:
             float: Current exchange rate (1 USD = X VND), None if failed
         """
-        # Check cache first
-        if use_cache and self._is_cache_valid():
-            return self._cached_rate
+        if use_cache:
+            entry = _rate_cache.get(self._fetch_rate)
+        else:
+            result = self._fetch_rate()
+            entry = _rate_cache.store(*result) if result else _rate_cache.peek()
+
+        if entry is None:
+            return None
 
-        # Primary strategy: Vietcombank API
-        rate = self._fetch_from_vietcombank()
-        if rate:
-            self._update_cache(rate, self.vietcombank_url)
-            return rate
+        self._cached_rate = entry["rate"]
+        self._cache_timestamp = entry["timestamp"]
+        self._last_source = entry.get("source")
+        return self._cached_rate
 
-        # Fallback strategy: investing.com scraping
+    def _fetch_from_investing(self) -> Optional[float]:
+        """
+        Fetch the USD/VND rate by scraping investing.com
+
+        Returns:
+            float: Exchange rate if found and plausible, None otherwise
+        """
         html_content = self._fetch_page_content()
-        if html_content:
-            rate = self._extract_exchange_rate(html_content)
-            if rate:
-                self._update_cache(rate, self.url)
-                return rate
-
-        # Last resort: return cached rate if available
-        if self._cached_rate:
-            print("Using cached rate due to fetch failure from all sources")
-            return self._cached_rate
+        if not html_content:
+            return None
+        rate = self._extract_exchange_rate(html_content)
+        return rate if _is_plausible_rate(rate) else None
+
+    def _call_source(self, name: str, fetch: Callable[[], Optional[float]]) -> Optional[float]:
+        """Call one source and record the outcome on its circuit breaker"""
+        try:
+            rate = fetch()
+        except Exception as e:
+            print(f"Error fetching rate from {name}: {e}")
+            rate = None
+        breaker = _breakers[name]
+        if rate is None:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        metrics.inc("goldbot_exchange_rate_source_total", source=name, result="ok" if rate else "failed")
+        return rate
+
+    def _fetch_rate(self) -> Optional[Tuple[float, str]]:
+        """
+        Fetch the rate with a hedged request
 
-        return None
+        Vietcombank is tried first; if it has not answered within
+        EXCHANGE_RATE_HEDGE_DELAY seconds (or failed, or its circuit is open),
+        investing.com is started as well and the first plausible rate wins.
+        Sources whose circuit breaker is open are skipped.
 
-    def _update_cache(self, rate: float, source: str) -> None:
-        """Store the freshly fetched rate and remember its source."""
-        self._cached_rate = rate
-        self._cache_timestamp = time.time()
-        self._last_source = source
+        Returns:
+            tuple: (rate, source URL) if any source succeeded, None otherwise
+        """
+        sources = [
+            ("vietcombank", self._fetch_from_vietcombank, self.vietcombank_url),
+            ("investing", self._fetch_from_investing, self.url),
+        ]
+        executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="exchange-rate")
+        pending = {}
+        submitted = 0
+        try:
+            for i, (name, fetch, url) in enumerate(sources):
+                # allow() ngay trước khi gửi: ở trạng thái half-open nó giữ lượt thử duy nhất,
+                # nên chỉ gọi cho nguồn thực sự được gửi request
+                if not _breakers[name].allow():
+                    continue
+                pending[executor.submit(self._call_source, name, fetch)] = url
+                submitted += 1
+                # Chờ nguồn trước một chút rồi mới gửi request dự phòng (trừ nguồn cuối)
+                if i < len(sources) - 1:
+                    done, _ = wait(pending, timeout=EXCHANGE_RATE_HEDGE_DELAY, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url_done = pending.pop(future)
+                        if future.result():
+                            return future.result(), url_done
+
+            if not submitted:
+                print("All exchange-rate sources are temporarily disabled (circuit open)")
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url_done = pending.pop(future)
+                    if future.result():
+                        return future.result(), url_done
+            return None
+        finally:
+            # Không chờ request còn lại: kết quả của nó chỉ còn dùng để cập nhật circuit breaker
+            executor.shutdown(wait=False)
 
     def _is_cache_valid(self) -> bool:
         """Check if cached rate is still valid"""
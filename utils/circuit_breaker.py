@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker an toàn đa luồng cho một nguồn dữ liệu.
+
+    - closed: cho phép mọi lần gọi; lỗi liên tiếp đủ `failure_threshold` lần thì chuyển sang open.
+    - open: bỏ qua nguồn trong `cooldown` giây.
+    - half-open: hết cooldown thì cho đúng một lần gọi thử; thành công thì closed, lỗi thì open lại.
+
+    Với `state_path`, số lỗi và thời điểm mở được lưu vào file JSON (theo `name`, nhiều breaker
+    dùng chung một file) để các lần chạy sau (cron, --check-updates) vẫn bỏ qua nguồn đang lỗi.
+    """
+
+    def __init__(self, name, failure_threshold=3, cooldown=300, state_path=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state_path = state_path
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+        if state_path:
+            self._load_state()
+
+    def _read_file(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Failed to load circuit breaker state: {e}")
+            return {}
+
+    def _load_state(self):
+        entry = self._read_file().get(self.name) or {}
+        self._failures = int(entry.get("failures") or 0)
+        opened_at = entry.get("opened_at")
+        if isinstance(opened_at, (int, float)):
+            # File lưu giờ hệ thống; trong tiến trình dùng đồng hồ monotonic
+            self._opened_at = time.monotonic() - max(time.time() - opened_at, 0)
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        opened_at = None
+        if self._opened_at is not None:
+            opened_at = time.time() - (time.monotonic() - self._opened_at)
+        data = self._read_file()
+        data[self.name] = {"failures": self._failures, "opened_at": opened_at}
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp_path = f"{self.state_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            print(f"Failed to save circuit breaker state: {e}")
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """True nếu được gọi nguồn lúc này."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            changed = self._failures or self._opened_at is not None
+            if self._opened_at is not None:
+                print(f"Circuit '{self.name}' closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+            if changed:
+                self._save_state()
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            was_trial = self._trial_running
+            self._trial_running = False
+            if was_trial or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                print(f"Circuit '{self.name}' opened for {self.cooldown}s after {self._failures} failures")
+            self._save_state()
@@ -0,0 +1,79 @@
+import codecs
+from html.parser import HTMLParser
+
+
+class _ElementCloseParser(HTMLParser):
+    """Theo dõi phần tử `tag` đầu tiên có class `class_` và đánh dấu khi thẻ đóng của nó xuất hiện."""
+
+    def __init__(self, tag, class_):
+        super().__init__(convert_charrefs=False)
+        self.tag = tag
+        self.class_ = class_
+        self.depth = 0  # số thẻ `tag` đang mở bên trong phần tử đích (kể cả chính nó)
+        self.closed = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.closed or tag != self.tag:
+            return
+        if self.depth:
+            self.depth += 1
+            return
+        classes = (dict(attrs).get("class") or "").split()
+        if self.class_ in classes:
+            self.depth = 1
+
+    def handle_endtag(self, tag):
+        if self.closed or tag != self.tag or not self.depth:
+            return
+        self.depth -= 1
+        if self.depth == 0:
+            self.closed = True
+
+
+class ElementStreamWatcher:
+    """
+    Nhận từng chunk bytes của trang HTML đang tải và cho biết khi nào phần tử đích
+    (`<tag class="... class_ ...">`) đã đóng, để có thể dừng tải phần còn lại.
+
+    Chỉ bắt đầu parse từ thẻ mở gần nhất trước lần xuất hiện đầu tiên của tên class,
+    nên phần đầu trang (head, script, ...) không phải đi qua HTMLParser.
+    """
+
+    # Số byte giữ lại khi chưa thấy tên class: đủ cho thẻ mở bị cắt giữa hai chunk
+    _TAIL = 2048
+
+    def __init__(self, tag, class_):
+        if not class_:
+            raise ValueError("class_ must be a non-empty class name")
+        self.tag = tag
+        self._marker = class_.encode("utf-8")
+        self._open_tag = b"<" + tag.encode("utf-8")
+        self._pending = b""
+        self._parser = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._class = class_
+        self.closed = False
+
+    def feed(self, chunk):
+        """Trả về True khi phần tử đích đã đóng."""
+        if self.closed:
+            return True
+
+        if self._parser is None:
+            self._pending += chunk
+            while True:
+                pos = self._pending.find(self._marker)
+                if pos < 0:
+                    self._pending = self._pending[-self._TAIL:]
+                    return False
+                start = self._pending.rfind(self._open_tag, 0, pos)
+                if start >= 0:
+                    break
+                # Tên class xuất hiện ngoài thẻ `tag` (vd. trong CSS): tìm tiếp
+                self._pending = self._pending[pos + len(self._marker):]
+            self._parser = _ElementCloseParser(self.tag, self._class)
+            chunk, self._pending = self._pending[start:], b""
+
+        self._parser.feed(self._decoder.decode(chunk))
+        self.closed = self._parser.closed
+        return self.closed